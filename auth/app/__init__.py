@@ -0,0 +1,4 @@
+import time
+
+# taken when the first app module is imported, so startup timings include import time
+STARTED_AT = time.perf_counter()
@@ -1,12 +1,12 @@
 from aiokafka import AIOKafkaProducer
 from app.api.schemas import TokenData
+from app.cache import TTLCache, UserCache
 from app.db.models import User
 from app.db.repositories import UserRepository
 from app.db.session import Database
-from app.security import oauth2_scheme
-from app.settings.config import settings
+from app.security import decode_access_token, oauth2_scheme
 from fastapi import Depends, HTTPException
-from jose import JWTError, jwt
+from jose import JWTError
 from starlette import status
 from starlette.requests import Request
 
@@ -25,19 +25,29 @@ def get_kafka_producer(request: Request) -> AIOKafkaProducer:
     return request.app.state.producer
 
 
+def get_user_cache(request: Request) -> UserCache:
+    return request.app.state.user_cache
+
+
+def get_token_cache(request: Request) -> TTLCache:
+    return request.app.state.token_cache
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     user_repository: UserRepository = Depends(get_user_repository),
+    user_cache: UserCache = Depends(get_user_cache),
+    token_cache: TTLCache = Depends(get_token_cache),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if token is None:
+        raise credentials_exception
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token, token_cache)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -45,9 +55,12 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = await user_repository.get_user_by_username(username=token_data.username)
+    user = user_cache.get_by_username(token_data.username)
     if user is None:
-        raise credentials_exception
+        user = await user_repository.get_user_by_username(username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        user_cache.add(user)
     return user
 
 
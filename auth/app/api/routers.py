@@ -1,27 +1,35 @@
 from datetime import timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator
+from uuid import UUID
 
-from aiokafka import AIOKafkaProducer
-from app.api.deps import (
-    get_current_active_user,
-    get_kafka_producer,
-    get_user_repository,
-)
+from app.api.deps import get_current_active_user, get_user_cache, get_user_repository
 from app.api.schemas import Role, Token, UserRead, UserWrite
+from app.cache import UserCache
 from app.db.models import User
 from app.db.repositories import UserRepository
-from app.events.user import UserCreated, UserStream
-from app.security import authenticate_user, create_access_token
+from app.events.user import UserCreated, UserStream, UserUpdated
+from app.metrics import CONTENT_TYPE, REGISTRY
+from app.security import authenticate_user, create_access_token, user_claims
 from app.settings.config import settings
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, RedirectResponse
-from starlette.templating import Jinja2Templates, _TemplateResponse
+from starlette.responses import HTMLResponse, RedirectResponse, Response
+
+if TYPE_CHECKING:
+    from starlette.templating import Jinja2Templates, _TemplateResponse
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="app/api/templates")
+
+@lru_cache
+def get_templates() -> "Jinja2Templates":
+    # jinja2 is imported when the first page is rendered instead of at every worker start
+    from starlette.templating import Jinja2Templates
+
+    return Jinja2Templates(directory="app/api/templates")
 
 
 @router.get("/")
@@ -29,15 +37,28 @@ async def redirect_to_login() -> RedirectResponse:
     return RedirectResponse("/login", status_code=302)
 
 
+@router.get("/ready", include_in_schema=False)
+async def read_readiness(request: Request) -> Response:
+    # per worker: ready once its startup hooks ran, until it starts draining; not ready
+    # while its user cache misses invalidations
+    ready = request.app.state.ready and request.app.state.user_cache_invalidation.up
+    return Response(status_code=200 if ready else 503)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @router.get(
     "/login",
     response_class=HTMLResponse,
     description="Login",
     name="login",
 )
-def show_login_form(request: Request) -> _TemplateResponse:
+def show_login_form(request: Request) -> "_TemplateResponse":
     context = {"request": request}
-    return templates.TemplateResponse("login.html", context=context)
+    return get_templates().TemplateResponse("login.html", context=context)
 
 
 @router.get(
@@ -46,10 +67,10 @@ def show_login_form(request: Request) -> _TemplateResponse:
     description="Show registration form",
     name="register",
 )
-def show_registration_form(request: Request) -> _TemplateResponse:
+def show_registration_form(request: Request) -> "_TemplateResponse":
     available_roles = [r.value for r in Role]
     context = {"request": request, "available_roles": available_roles}
-    return templates.TemplateResponse("register.html", context=context)
+    return get_templates().TemplateResponse("register.html", context=context)
 
 
 @router.get(
@@ -60,11 +81,11 @@ def show_registration_form(request: Request) -> _TemplateResponse:
 )
 def get_all_users(
     request: Request,
-) -> _TemplateResponse:
+) -> "_TemplateResponse":
     context = {
         "request": request,
     }
-    return templates.TemplateResponse("users.html", context=context)
+    return get_templates().TemplateResponse("users.html", context=context)
 
 
 @router.get(
@@ -75,11 +96,11 @@ def get_all_users(
 )
 def get_current_user(
     request: Request,
-) -> _TemplateResponse:
+) -> "_TemplateResponse":
     context = {
         "request": request,
     }
-    return templates.TemplateResponse("users_me.html", context=context)
+    return get_templates().TemplateResponse("users_me.html", context=context)
 
 
 @router.post(
@@ -102,7 +123,7 @@ async def get_auth_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token = create_access_token(
-        data={"sub": user.username},
+        data=user_claims(user),
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -134,14 +155,10 @@ async def read_all_users(
 async def create_user(
     user_to_create: UserWrite,
     user_repository: UserRepository = Depends(get_user_repository),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
 ):
-    new_user = await user_repository.create_new_user(user_to_create)
-
-    event = UserCreated(data=UserStream.from_orm(new_user))
-    await event.send(kafka_producer, topic=settings.KAFKA_USER_STREAMING_TOPIC)
-
-    return new_user
+    return await user_repository.create_new_user(
+        user_to_create, events=iter_user_created_events
+    )
 
 
 @router.get("/api/users/me", response_model=UserRead)
@@ -161,3 +178,48 @@ async def read_users_by_username(
     user = user_repository.get_user_by_username(username)
 
     return user
+
+
+@router.put("/api/users/{public_id}/role", response_model=UserRead)
+async def update_user_role(
+    public_id: UUID,
+    role: Role,
+    current_user: User = Depends(get_current_active_user),
+    user_repository: UserRepository = Depends(get_user_repository),
+    user_cache: UserCache = Depends(get_user_cache),
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    user = await user_repository.update_role(
+        public_id, role, events=iter_user_updated_events
+    )
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(user.public_id, username=user.username)
+    return user
+
+
+@router.post("/api/users/{public_id}/deactivate", response_model=UserRead)
+async def deactivate_user(
+    public_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    user_repository: UserRepository = Depends(get_user_repository),
+    user_cache: UserCache = Depends(get_user_cache),
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    user = await user_repository.deactivate(public_id, events=iter_user_updated_events)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(user.public_id, username=user.username)
+    return user
+
+
+def iter_user_created_events(user: User) -> Iterator[tuple[UserCreated, str]]:
+    event = UserCreated(data=UserStream.from_orm(user))
+    yield event, settings.KAFKA_USER_STREAMING_TOPIC
+
+
+def iter_user_updated_events(user: User) -> Iterator[tuple[UserUpdated, str]]:
+    event = UserUpdated(data=UserStream.from_orm(user))
+    yield event, settings.KAFKA_USER_STREAMING_TOPIC
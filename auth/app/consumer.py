@@ -0,0 +1,101 @@
+import asyncio
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from aiokafka import AIOKafkaConsumer
+from app.cache import UserCache
+from app.codecs import DecodeError, decode_message
+from app.metrics import Counter
+from app.settings.config import settings
+from loguru import logger
+
+CONSUMER_RESTARTS = Counter(
+    "background_consumer_restarts_total",
+    "Times a consumer running inside the server was restarted after it stopped",
+    ("consumer",),
+)
+
+
+class BackgroundConsumer:
+    """Keeps a consumer running inside a server process, restarting it with backoff.
+
+    ``consume`` calls ``on_started`` once it is subscribed; ``up`` is true from then
+    until it stops.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        consume: Callable[[Callable[[], None]], Awaitable[None]],
+        min_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.consume = consume
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.up = False
+        self.restarts = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def _mark_up(self) -> None:
+        self.up = True
+
+    async def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            try:
+                await self.consume(self._mark_up)
+                logger.warning("{} consumer stopped", self.name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("{} consumer failed", self.name)
+            if self.up:
+                backoff = self.min_backoff
+            self.up = False
+            self.restarts += 1
+            CONSUMER_RESTARTS.inc(consumer=self.name)
+            logger.info("Restarting {} consumer in {:.1f}s", self.name, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+async def invalidate_user_cache(
+    user_cache: UserCache, on_started: Callable[[], None]
+) -> None:
+    """Drop cached users as their events arrive; runs inside every server process."""
+    # no group_id: each server process has its own cache and must see every user event
+    consumer = AIOKafkaConsumer(
+        settings.KAFKA_USER_STREAMING_TOPIC,
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+    )
+    await consumer.start()
+    try:
+        # events published while no consumer was running are never seen
+        user_cache.clear()
+        on_started()
+        async for msg in consumer:
+            try:
+                data = decode_message(msg.value, msg.headers).get("data")
+                user_cache.invalidate(
+                    UUID(data["public_id"]), username=data.get("username")
+                )
+            except (DecodeError, KeyError, TypeError, ValueError) as exc:
+                logger.warning(
+                    "Can't invalidate cached user from message {}: {}", msg, exc
+                )
+    finally:
+        await consumer.stop()
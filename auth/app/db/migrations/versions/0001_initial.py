@@ -0,0 +1,83 @@
+"""initial
+
+Revision ID: 0001
+Revises:
+Create Date: 2022-05-27 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import context, op
+from fastapi_utils.guid_type import GUID
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # databases created by metadata.create_all before migrations existed already have
+    # some of these tables, the user table possibly without its version column
+    if context.is_offline_mode():
+        existing_tables, user_columns = set(), set()
+    else:
+        inspector = sa.inspect(op.get_bind())
+        existing_tables = set(inspector.get_table_names())
+        user_columns = set()
+        if "user" in existing_tables:
+            user_columns = {column["name"] for column in inspector.get_columns("user")}
+    if "user" not in existing_tables:
+        op.create_table(
+            "user",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("public_id", GUID(), nullable=False),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column(
+                "role",
+                sa.Enum("ADMIN", "MANAGER", "ACCOUNTANT", "DEVELOPER", name="role"),
+                nullable=False,
+            ),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_user_public_id", "user", ["public_id"], unique=True)
+        op.create_index("ix_user_username", "user", ["username"], unique=True)
+        op.create_index("ix_user_email", "user", ["email"], unique=True)
+    elif "version" not in user_columns:
+        op.add_column(
+            "user",
+            sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        )
+    if "outboxmessage" not in existing_tables:
+        op.create_table(
+            "outboxmessage",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("topic", sa.String(), nullable=False),
+            sa.Column("event_name", sa.String(), nullable=False),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            "ix_outboxmessage_unsent",
+            "outboxmessage",
+            ["id"],
+            postgresql_where=sa.text("sent_at IS NULL"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outboxmessage_unsent", table_name="outboxmessage")
+    op.drop_table("outboxmessage")
+    op.drop_index("ix_user_email", table_name="user")
+    op.drop_index("ix_user_username", table_name="user")
+    op.drop_index("ix_user_public_id", table_name="user")
+    op.drop_table("user")
+    sa.Enum(name="role").drop(op.get_bind())
@@ -3,8 +3,14 @@ import uuid
 from datetime import datetime
 
 from app.db.session import Base
-from fastapi_utils.guid_type import GUID
-from sqlalchemy import Boolean, Column, DateTime, Enum, Integer, String
+from fastapi_utils import guid_type
+from sqlalchemy import Boolean, Column, DateTime, Enum, Index, Integer, String, Text
+
+
+class GUID(guid_type.GUID):
+    # fastapi-utils leaves cache_ok unset, which keeps every statement touching a UUID
+    # column out of the SQL compilation cache; the type holds no state, so caching is safe
+    cache_ok = True
 
 
 class Role(str, enum.Enum):
@@ -24,7 +30,21 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean(), default=True)
     role = Column(Enum(Role), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime(timezone=True), default=datetime.now)
     updated_at = Column(
         DateTime(timezone=True), default=datetime.now, onupdate=datetime.now
     )
+
+
+class OutboxMessage(Base):
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)
+    event_name = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_outboxmessage_unsent", "id", postgresql_where=sent_at.is_(None)),
+    )
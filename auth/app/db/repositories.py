@@ -1,10 +1,23 @@
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Iterable
 from uuid import UUID
 
 from app.api.schemas import UserWrite
-from app.db.models import Role, User
+from app.db.models import OutboxMessage, Role, User
 from app.db.session import Database
-from sqlalchemy import select, update
+from sqlalchemy import delete, select, update
+
+UserEvents = Callable[[User], Iterable[tuple[Any, str]]]
+
+
+def to_outbox_messages(events: Iterable[tuple[Any, str]]) -> list[OutboxMessage]:
+    return [
+        OutboxMessage(
+            topic=topic, event_name=type(event).__name__, payload=event.json()
+        )
+        for event, topic in events
+    ]
 
 
 @dataclass
@@ -29,28 +42,95 @@ class UserRepository:
             user = await session.execute(query)
             return user.scalar()
 
-    async def create_new_user(self, user_to_create: UserWrite) -> User:
-        from app.security import get_password_hash
+    async def create_new_user(
+        self, user_to_create: UserWrite, events: UserEvents | None = None
+    ) -> User:
+        from app.security import password_hasher
 
         user = User(
             username=user_to_create.username,
             email=user_to_create.email,
-            hashed_password=get_password_hash(user_to_create.password),
+            hashed_password=await password_hasher.hash(user_to_create.password),
             is_active=True,
             role=user_to_create.role,
         )
         async with self.db.session() as session:
             session.add(user)
+            await session.flush()
+            if events is not None:
+                session.add_all(to_outbox_messages(events(user)))
             await session.commit()
             await session.refresh(user)
         return user
 
-    async def deactivate(self, user_id: UUID) -> None:
-        query = update(User).where(id=user_id).values(is_active=False)
+    async def deactivate(
+        self, user_id: UUID, events: UserEvents | None = None
+    ) -> User | None:
+        return await self._update_user(user_id, events, is_active=False)
+
+    async def update_role(
+        self, user_id: UUID, new_role: Role, events: UserEvents | None = None
+    ) -> User | None:
+        return await self._update_user(user_id, events, role=new_role)
+
+    async def _update_user(
+        self, user_id: UUID, events: UserEvents | None, **values: Any
+    ) -> User | None:
+        # every change bumps the version consumers use to drop stale and replayed events
+        query = (
+            update(User)
+            .where(User.public_id == user_id)
+            .values(version=User.version + 1, **values)
+            .returning(User)
+        )
+        async with self.db.session() as session:
+            user = (await session.execute(select(User).from_statement(query))).scalar()
+            if user is None:
+                return None
+            if events is not None:
+                session.add_all(to_outbox_messages(events(user)))
+            await session.commit()
+        return user
+
+
+@dataclass
+class OutboxRepository:
+    db: Database
+
+    async def relay(
+        self,
+        publish: Callable[[list[OutboxMessage]], Awaitable[None]],
+        batch_size: int,
+    ) -> int:
+        """Publish the oldest unsent messages, mark them sent and return their count."""
         async with self.db.session() as session:
-            await session.execute(query)
+            query = (
+                select(OutboxMessage)
+                .where(OutboxMessage.sent_at.is_(None))
+                .order_by(OutboxMessage.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = (await session.execute(query)).scalars().all()
+            if not messages:
+                return 0
+
+            await publish(messages)
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([message.id for message in messages]))
+                .values(sent_at=datetime.now())
+            )
+            await session.commit()
+            return len(messages)
 
-    async def update_role(self, user_id: UUID, new_role: Role) -> None:
-        query = update(User).where(id=user_id).values(role=new_role)
+    async def delete_sent(self, older_than: timedelta) -> int:
+        """Delete messages sent more than ``older_than`` ago and return their count."""
         async with self.db.session() as session:
-            await session.execute(query)
+            deleted = await session.execute(
+                delete(OutboxMessage).where(
+                    OutboxMessage.sent_at < datetime.now() - older_than
+                )
+            )
+            await session.commit()
+            return deleted.rowcount
@@ -1,14 +1,58 @@
-from asyncio import current_task
+import time
+from asyncio import Task, current_task
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator
 
+from app.metrics import Counter, Gauge, Histogram
 from loguru import logger
-from sqlalchemy.ext.asyncio import (
-    AsyncSession,
-    async_scoped_session,
-    create_async_engine,
-)
+from sqlalchemy import event
+from sqlalchemy.engine import ExecutionContext
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import as_declarative, declared_attr, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ("engine",),
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently in use", ("engine",)
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections currently open beyond the pool size", ("engine",)
+)
+POOL_OVERFLOWS = Counter(
+    "db_pool_overflows_total", "Connections opened beyond the pool size", ("engine",)
+)
+STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "Time spent executing SQL statements", ("engine",)
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that timed out waiting for a connection",
+    ("engine",),
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording checkout waits, overflow and timeouts per logging name."""
+
+    def _do_get(self):
+        engine = self.logging_name
+        overflow = self.overflow()
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            POOL_TIMEOUTS.inc(engine=engine)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started_at, engine=engine)
+        if self.overflow() > max(overflow, 0):
+            POOL_OVERFLOWS.inc(engine=engine)
+        return connection
 
 
 @as_declarative()
@@ -22,26 +66,67 @@ class Base:
 
 
 class Database:
-    def __init__(self, db_connect_url: str, **connection_kwargs: Any) -> None:
-        self._engine = create_async_engine(url=db_connect_url, **connection_kwargs)
-        self._async_session_factory = async_scoped_session(
-            sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                class_=AsyncSession,
-                expire_on_commit=False,
-                bind=self._engine,
-            ),
-            scopefunc=current_task,
+    def __init__(
+        self, db_connect_url: str, name: str = "main", **connection_kwargs: Any
+    ) -> None:
+        self._engine = create_async_engine(
+            url=db_connect_url,
+            poolclass=InstrumentedQueuePool,
+            pool_logging_name=name,
+            **connection_kwargs,
         )
+        # the engine replaces its pool on dispose, so read it at scrape time
+        POOL_CHECKED_OUT.set_function(
+            lambda: self._engine.pool.checkedout(), engine=name
+        )
+        POOL_OVERFLOW.set_function(
+            lambda: max(self._engine.pool.overflow(), 0), engine=name
+        )
+        self._session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        event.listen(
+            self._engine.sync_engine, "before_cursor_execute", start_statement_timer
+        )
+        event.listen(
+            self._engine.sync_engine, "after_cursor_execute", stop_statement_timer
+        )
+        # per-task sessions of unit_of_work() blocks; None until first used
+        self._shared_sessions: dict[Task, AsyncSession | None] = {}
 
-    async def create_tables(self) -> None:
-        async with self._engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncGenerator[None, None]:
+        """Serve all session() calls of the current task from one session.
+
+        Its connection is checked out on first use and returned when the block
+        exits; repositories still commit their own transactions and anything
+        left uncommitted is rolled back.
+        """
+        task = current_task()
+        self._shared_sessions[task] = None
+        try:
+            yield
+        finally:
+            session = self._shared_sessions.pop(task)
+            if session is not None:
+                await session.close()
+                await session.bind.close()
 
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
-        session: AsyncSession = self._async_session_factory()
+        task = current_task()
+        shared = task in self._shared_sessions
+        if shared:
+            session = self._shared_sessions[task]
+            if session is None:
+                session = self._shared_sessions[task] = self._session_factory(
+                    bind=await self._engine.connect()
+                )
+        else:
+            session = self._session_factory(bind=self._engine)
         try:
             yield session
         except Exception:
@@ -49,8 +134,23 @@ class Database:
             await session.rollback()
             raise
         finally:
-            await session.close()
-            await self._async_session_factory.remove()
+            if not shared:
+                await session.close()
 
     async def disconnect(self) -> None:
         await self._engine.dispose()
+
+
+def start_statement_timer(
+    conn, cursor, statement, parameters, context: ExecutionContext, executemany
+) -> None:
+    context._statement_started_at = time.perf_counter()
+
+
+def stop_statement_timer(
+    conn, cursor, statement, parameters, context: ExecutionContext, executemany
+) -> None:
+    STATEMENT_DURATION.observe(
+        time.perf_counter() - context._statement_started_at,
+        engine=conn.engine.pool.logging_name,
+    )
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+from aiokafka import AIOKafkaProducer
+from app.codecs import Codec, encode_event, get_event_codec
+from app.metrics import Counter, Histogram
+from app.settings.config import settings
+from loguru import logger
+
+T = TypeVar("T")
+
+SEND_DURATION = Histogram(
+    "kafka_send_duration_seconds",
+    "Time from sending an event to its broker ack",
+    ("topic",),
+)
+SEND_ERRORS = Counter(
+    "kafka_send_errors_total", "Events that failed to send", ("topic",)
+)
+
+
+async def send_events(
+    producer: AIOKafkaProducer,
+    events: Iterable[tuple[Any, str]],
+    batch_size: int = settings.KAFKA_PUBLISH_BATCH_SIZE,
+    codec: Codec | None = None,
+) -> int:
+    """Send (event, topic) pairs concurrently, awaiting acks once per batch."""
+    codec = codec or get_event_codec()
+    sent = 0
+    batch = []
+    for event, topic in events:
+        value, headers = encode_event(event, codec)
+        send = producer.send_and_wait(
+            topic, value=value, key=get_partition_key(event), headers=headers
+        )
+        batch.append(timed_send(send, topic))
+        if len(batch) >= batch_size:
+            await asyncio.gather(*batch)
+            sent += len(batch)
+            batch = []
+    if batch:
+        await asyncio.gather(*batch)
+        sent += len(batch)
+    return sent
+
+
+def get_partition_key(event: Any) -> bytes | None:
+    """Key messages by public_id so events of one entity stay in one partition."""
+    public_id = getattr(getattr(event, "data", None), "public_id", None)
+    return str(public_id).encode() if public_id is not None else None
+
+
+async def timed_send(send: Awaitable[T], topic: str) -> T:
+    started_at = time.perf_counter()
+    try:
+        return await send
+    except Exception:
+        SEND_ERRORS.inc(topic=topic)
+        raise
+    finally:
+        SEND_DURATION.observe(time.perf_counter() - started_at, topic=topic)
+
+
+async def relay_outbox(
+    relay_batch: Callable[[], Awaitable[int]],
+    batch_size: int = settings.OUTBOX_BATCH_SIZE,
+    poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+    max_retries: int = settings.OUTBOX_MAX_RETRIES,
+    max_backoff: float = settings.OUTBOX_MAX_RETRY_BACKOFF,
+) -> None:
+    """Call ``relay_batch`` until cancelled, polling when it relays a partial batch.
+
+    Unsent messages stay in the outbox, so a broker or database blip only delays them:
+    failures are retried with backoff, and the last one is raised after
+    ``max_retries`` in a row for the process supervisor to restart it.
+    """
+    failures = 0
+    while True:
+        try:
+            relayed = await relay_batch()
+        except Exception:
+            failures += 1
+            if failures > max_retries:
+                raise
+            backoff = min(poll_interval * 2**failures, max_backoff)
+            logger.exception(
+                "Relaying failed {} times in a row, retrying in {:.1f}s",
+                failures,
+                backoff,
+            )
+            await asyncio.sleep(backoff)
+            continue
+        failures = 0
+        if relayed < batch_size:
+            await asyncio.sleep(poll_interval)
@@ -1,7 +1,14 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable, TypeVar
 
+from app.cache import TTLCache
 from app.db.models import User
 from app.db.repositories import UserRepository
+from app.metrics import Counter, Gauge, Histogram
 from app.settings.config import settings
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
@@ -10,6 +17,21 @@ from passlib.context import CryptContext
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 hasher = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+HASHER_PENDING = Gauge(
+    "password_hasher_pending", "Password hashing jobs queued or running"
+)
+HASHER_REJECTED = Counter(
+    "password_hasher_rejected_total",
+    "Password hashing jobs rejected because the queue was full",
+)
+HASHER_LATENCY = Histogram(
+    "password_hasher_duration_seconds",
+    "Time from submitting a password hashing job to its result",
+    ("operation",),
+)
+
 
 def verify_password(plain_password, hashed_password):
     return hasher.verify(plain_password, hashed_password)
@@ -19,12 +41,100 @@ def get_password_hash(password) -> str:
     return hasher.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop with a bounded number of pending jobs."""
+
+    def __init__(
+        self, max_workers: int, max_pending: int, use_processes: bool = False
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._pending = 0
+        HASHER_PENDING.set_function(lambda: self._pending)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify", verify_password, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, operation: str, func: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            HASHER_REJECTED.inc()
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            executor_class = (
+                ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            )
+            self._executor = executor_class(max_workers=self.max_workers)
+
+        self._pending += 1
+        started_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            HASHER_LATENCY.observe(
+                time.perf_counter() - started_at, operation=operation
+            )
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASHER_WORKERS,
+    max_pending=settings.PASSWORD_HASHER_MAX_PENDING,
+    use_processes=settings.PASSWORD_HASHER_USE_PROCESSES,
+)
+
+
+def decode_access_token(
+    token: str, token_cache: TTLCache[bytes, dict[str, Any]]
+) -> dict[str, Any]:
+    """Verify the token once and reuse its claims from cache until it expires."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        expires_in = (
+            payload["exp"] - time.time() if "exp" in payload else token_cache.ttl
+        )
+        if expires_in > 0:
+            token_cache.set(key, payload, ttl=expires_in)
+    return payload
+
+
+def user_claims(user: User) -> dict[str, Any]:
+    """Claims other services can trust instead of looking the user up."""
+    return {
+        "sub": user.username,
+        "public_id": str(user.public_id),
+        "role": user.role.value,
+        "is_active": user.is_active,
+        "ver": user.version,
+    }
+
+
 def create_access_token(
     data: dict, expires_delta: timedelta = timedelta(minutes=15)
 ) -> str:
     data_to_encode = data.copy()
-    expires_at = datetime.utcnow() + expires_delta
-    data_to_encode.update({"exp": expires_at})
+    issued_at = datetime.utcnow()
+    data_to_encode.update({"iat": issued_at, "exp": issued_at + expires_delta})
     encoded_jwt = jwt.encode(
         data_to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
@@ -39,6 +149,6 @@ async def authenticate_user(
     user = await user_repository.get_user_by_username(username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
     return user
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import signal
+import socket
+from types import FrameType
+
+import uvicorn
+from app.server import app  # imported by the supervisor too: a broken app fails early
+from app.settings.config import settings
+from loguru import logger
+from uvicorn.supervisors import Multiprocess
+
+
+class Server(uvicorn.Server):
+    """uvicorn server with a bounded drain that always runs the app shutdown hooks."""
+
+    drain_expired = False
+
+    def handle_exit(self, sig: signal.Signals, frame: FrameType | None) -> None:
+        super().handle_exit(sig, frame)
+        app.state.ready = False
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        timer = loop.call_later(settings.SERVER_DRAIN_TIMEOUT, self.expire_drain)
+        try:
+            await super().shutdown(sockets=sockets)
+        finally:
+            timer.cancel()
+        if self.drain_expired:
+            # cut requests are lost, but kafka events are flushed and the pool closed
+            await self.lifespan.shutdown()
+
+    def expire_drain(self) -> None:
+        logger.warning(
+            "Connections did not drain in {}s, closing them",
+            settings.SERVER_DRAIN_TIMEOUT,
+        )
+        self.drain_expired = True
+        self.force_exit = True
+
+
+class Supervisor(Multiprocess):
+    def shutdown(self) -> None:
+        # stop every worker before waiting for any, so they drain in parallel
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        logger.info("Stopped {} server workers", len(self.processes))
+
+
+def main() -> None:
+    config = uvicorn.Config(
+        "app.server:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=settings.SERVER_WORKERS or os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+    )
+    server = Server(config=config)
+    if config.workers > 1:
+        Supervisor(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,36 @@
 import asyncio
+import time
 
 import uvloop
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import AIOKafkaProducer
+from app import STARTED_AT
+from app.api.middlewares import MetricsMiddleware, UnitOfWorkMiddleware
 from app.api.routers import router
+from app.cache import TTLCache, UserCache
+from app.consumer import BackgroundConsumer, invalidate_user_cache
 from app.db.session import Database
+from app.metrics import Gauge
+from app.security import PasswordHasherBusy, password_hasher
 from app.settings.config import AppSettings, settings
 from app.settings.logger import configure_logger
 from fastapi import FastAPI
 from loguru import logger
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
+STARTUP_DURATION = Gauge(
+    "app_startup_seconds",
+    "Seconds from the first app import to each startup phase",
+    ("phase",),
+)
+
 
 class Application:
     def __init__(self, settings: AppSettings):
+        STARTUP_DURATION.set(time.perf_counter() - STARTED_AT, phase="import")
         configure_logger(settings)
 
         self.app = FastAPI(
@@ -22,6 +39,7 @@ class Application:
             debug=settings.DEBUG,
         )
         self.app.state.config = settings
+        self.app.state.ready = False
         self.add_middlewares(settings)
         self.configure_hooks()
         self.register_urls()
@@ -32,27 +50,48 @@ class Application:
 
     def configure_hooks(self) -> None:
         self.setup_exception_handlers()
-        self.app.add_event_handler("startup", self.create_databases_and_tables)
+        self.app.add_event_handler("startup", self.create_database_pool)
         self.app.add_event_handler("startup", self.create_kafka_producer)
-        self.app.add_event_handler("startup", self.create_kafka_consumer)
+        self.app.add_event_handler("startup", self.create_user_cache)
+        self.app.add_event_handler("startup", self.create_token_cache)
+        self.app.add_event_handler("startup", self.mark_ready)
 
         self.app.add_event_handler("shutdown", self.close_database_pool)
         self.app.add_event_handler("shutdown", self.close_kafka_producer)
-        self.app.add_event_handler("shutdown", self.close_kafka_consumer)
+        self.app.add_event_handler("shutdown", self.close_user_cache)
+        self.app.add_event_handler("shutdown", self.close_password_hasher)
 
     def register_urls(self) -> None:
         self.app.include_router(router)
 
     def setup_exception_handlers(self) -> None:
-        pass
+        self.app.add_exception_handler(PasswordHasherBusy, self.password_hasher_busy)
+
+    @staticmethod
+    async def password_hasher_busy(
+        request: Request, exc: PasswordHasherBusy
+    ) -> JSONResponse:
+        return JSONResponse(
+            {"detail": "Too many concurrent logins, try again later"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": "1"},
+        )
 
     def add_middlewares(self, settings: AppSettings) -> None:
-        pass
+        self.app.add_middleware(UnitOfWorkMiddleware)
+        self.app.add_middleware(MetricsMiddleware)
+
+    async def mark_ready(self) -> None:
+        self.app.state.ready = True
+        STARTUP_DURATION.set(time.perf_counter() - STARTED_AT, phase="ready")
+        logger.info("Ready {:.2f}s after start", time.perf_counter() - STARTED_AT)
 
     async def create_database_pool(self) -> None:
         db = Database(
             db_connect_url=settings.database_connection_url,
+            name="server",
             echo=settings.DEBUG,
+            **settings.database_pool_options,
         )
         logger.info("Creating database connection")
         self.app.state.db = db
@@ -66,14 +105,27 @@ class Application:
         producer = self.app.state.producer
         await producer.stop()
 
-    async def create_kafka_consumer(self) -> None:
-        consumer = AIOKafkaConsumer(bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS)
-        await consumer.start()
-        self.app.state.consumer = consumer
+    async def create_user_cache(self) -> None:
+        user_cache = UserCache(
+            maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL
+        )
+        self.app.state.user_cache = user_cache
+        self.app.state.user_cache_invalidation = BackgroundConsumer(
+            "user_cache_invalidation",
+            lambda on_started: invalidate_user_cache(user_cache, on_started),
+        )
+        self.app.state.user_cache_invalidation.start()
 
-    async def close_kafka_consumer(self) -> None:
-        consumer = self.app.state.consumer
-        await consumer.stop()
+    async def close_user_cache(self) -> None:
+        await self.app.state.user_cache_invalidation.stop()
+
+    async def create_token_cache(self) -> None:
+        self.app.state.token_cache = TTLCache(
+            "token", maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL
+        )
+
+    async def close_password_hasher(self) -> None:
+        password_hasher.shutdown()
 
     async def close_database_pool(self) -> None:
         logger.info("Closing database pool")
@@ -82,9 +134,5 @@ class Application:
         except Exception as exc:
             logger.warning("failed to close database pool due to {}", exc)
 
-    async def create_databases_and_tables(self) -> None:
-        await self.create_database_pool()
-        await self.app.state.db.create_tables()
-
 
 app = Application(settings=settings).fastapi_app
@@ -1,5 +1,7 @@
+import os
 from enum import Enum
 from pathlib import Path
+from typing import Any
 
 from pydantic import BaseSettings
 
@@ -12,28 +14,80 @@ class LogLevelEnum(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+class EventCodecEnum(str, Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+    SCHEMA = "schema"
+
+
 class AppSettings(BaseSettings):
     LOG_LEVEL: LogLevelEnum = LogLevelEnum.DEBUG
     AIOKAFKA_LOG_LEVEL: LogLevelEnum = LogLevelEnum.INFO
 
     DEBUG: bool = False
 
+    APP_HOST: str = "0.0.0.0"
+    APP_PORT: int = 8080
+    SERVER_WORKERS: int | None = None  # defaults to the CPU count
+    SERVER_DRAIN_TIMEOUT: float = 30.0
+
     PG_USER: str
     PG_PASSWORD: str
     PG_HOST: str = "postgresql"
     PG_PORT: int = 5432
     PG_DB: str
 
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+
     KAFKA_BOOTSTRAP_SERVERS: str = "kafka:9092"
     KAFKA_USER_STREAMING_TOPIC: str
+    KAFKA_PRODUCER_LINGER_MS: int = 10
+    KAFKA_PRODUCER_MAX_BATCH_SIZE: int = 256 * 1024
+    KAFKA_PUBLISH_BATCH_SIZE: int = 1_000
+    KAFKA_EVENT_CODEC: EventCodecEnum = EventCodecEnum.JSON
+    EVENT_SCHEMA_REGISTRY_PATH: Path = Path("schemas")
+
+    OUTBOX_BATCH_SIZE: int = 5_000
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    OUTBOX_RETENTION: float = 24 * 60 * 60  # seconds to keep sent messages for
+    OUTBOX_CLEANUP_INTERVAL: float = 60.0
+    OUTBOX_MAX_RETRIES: int = 10  # consecutive failed batches before the relay exits
+    OUTBOX_MAX_RETRY_BACKOFF: float = 30.0
 
     SECRET_KEY: str  # To generate SECRET_KEY use `openssl rand -hex 32`
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+    PASSWORD_HASHER_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASHER_MAX_PENDING: int = 4 * (os.cpu_count() or 1)
+    PASSWORD_HASHER_USE_PROCESSES: bool = False
+
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 30.0
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL: float = 300.0  # used for tokens without exp claim
+
     @property
     def database_connection_url(self):
-        return f"postgresql+asyncpg://{self.PG_USER}:{self.PG_PASSWORD}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
+        return (
+            f"postgresql+asyncpg://{self.PG_USER}:{self.PG_PASSWORD}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
+            f"?prepared_statement_cache_size={self.DB_PREPARED_STATEMENT_CACHE_SIZE}"
+        )
+
+    @property
+    def database_pool_options(self) -> dict[str, Any]:
+        return {
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_POOL_MAX_OVERFLOW,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+        }
 
     class Config:
         env_file = f"app/settings/.env"
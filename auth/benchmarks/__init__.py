@@ -0,0 +1,3 @@
+"""Benchmarks, run from the auth directory as ``python -m benchmarks.<name>``."""
+# sets the environment the app settings are read from, so it has to run before any app module is imported
+from tests import conftest  # noqa: F401
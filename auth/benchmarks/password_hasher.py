@@ -0,0 +1,108 @@
+"""Measure password verification throughput and how long it stalls the event loop.
+
+``inline`` calls passlib in the coroutine, the way login did before ``PasswordHasher``; the other modes go through
+``PasswordHasher`` with a thread or process pool of each ``--workers`` size. While logins run, a ticker coroutine
+sleeps 1 ms at a time and records how late it wakes up: that lag is what every other request on the worker waits.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.security import (
+    PasswordHasher,
+    PasswordHasherBusy,
+    get_password_hash,
+    verify_password,
+)
+
+TICK = 0.001
+
+
+async def verify_inline(plain_password: str, hashed_password: str) -> bool:
+    return verify_password(plain_password, hashed_password)
+
+
+async def measure_lag(lags: list[float], stopped: asyncio.Event) -> None:
+    while not stopped.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started_at - TICK)
+
+
+async def run_logins(verify, count: int, concurrency: int) -> tuple[float, list[float]]:
+    hashed_password = get_password_hash("password")
+
+    async def worker(worker_count: int) -> None:
+        for _ in range(worker_count):
+            assert await verify("password", hashed_password)
+
+    lags: list[float] = []
+    stopped = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(lags, stopped))
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    stopped.set()
+    await ticker
+    return elapsed, lags
+
+
+async def count_rejected(hasher: PasswordHasher, requests: int) -> int:
+    hashed_password = get_password_hash("password")
+    results = await asyncio.gather(
+        *(hasher.verify("password", hashed_password) for _ in range(requests)),
+        return_exceptions=True,
+    )
+    return sum(isinstance(result, PasswordHasherBusy) for result in results)
+
+
+async def main(count: int, concurrency: int, workers: list[int]) -> None:
+    modes = [("inline", 1, verify_inline, None)]
+    for use_processes in (False, True):
+        for size in workers:
+            hasher = PasswordHasher(
+                size, max_pending=concurrency, use_processes=use_processes
+            )
+            modes.append(
+                (
+                    "processes" if use_processes else "threads",
+                    size,
+                    hasher.verify,
+                    hasher,
+                )
+            )
+
+    print(
+        f"{'mode':>9} {'workers':>7} {'logins':>6} {'logins/s':>8} "
+        f"{'p50 lag ms':>10} {'max lag ms':>10}"
+    )
+    for name, size, verify, hasher in modes:
+        if hasher is not None:
+            await verify("warm up", get_password_hash("warm up"))
+        elapsed, lags = await run_logins(verify, count, concurrency)
+        # the ticker wakes up at least once, after the last login
+        median_lag, max_lag = statistics.median(lags) * 1000, max(lags) * 1000
+        print(
+            f"{name:>9} {size:>7} {count:>6} {count / elapsed:>8.1f} "
+            f"{median_lag:>10.1f} {max_lag:>10.1f}"
+        )
+        if hasher is not None:
+            hasher.shutdown()
+
+    hasher = PasswordHasher(workers[0], max_pending=concurrency)
+    rejected = await count_rejected(hasher, 4 * concurrency)
+    hasher.shutdown()
+    print(
+        f"{4 * concurrency} simultaneous logins with max_pending={concurrency}: "
+        f"{rejected} rejected with 429"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", nargs="?", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.concurrency, args.workers))
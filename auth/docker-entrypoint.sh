@@ -7,11 +7,31 @@ serve() {
   wait_for_postgresql
   wait_for_kafka
 
+  exec python -m app.serve
+}
+
+serve_dev() {
+  wait_for_postgresql
+  wait_for_kafka
+
   export HOST=${APP_HOST:-0.0.0.0}
   export PORT=${APP_PORT:-8080}
   exec python -m uvicorn app.server:app --host "${HOST}" --port "${PORT}" --reload
 }
 
+migrate() {
+  wait_for_postgresql
+
+  exec python -m alembic -c app/db/alembic.ini upgrade head
+}
+
+relay() {
+  wait_for_postgresql
+  wait_for_kafka
+
+  exec python -m app.relay
+}
+
 wait_for_kafka() {
   until kafkacat -b "${KAFKA_BOOTSTRAP_SERVERS:-kafka:29092}" -L  > /dev/null 2>&1
   do
@@ -34,7 +54,10 @@ help() {
   echo "Usage:"
   echo ""
   echo "help -- show this help"
-  echo "serve -- start auth backend with hot-reloading"
+  echo "serve -- start auth backend with SERVER_WORKERS workers"
+  echo "serve-dev -- start auth backend with hot-reloading"
+  echo "relay -- publish outbox events to kafka"
+  echo "migrate -- apply database migrations"
   echo ""
 }
 
@@ -47,6 +70,18 @@ case "$1" in
     shift
     serve
     ;;
+  serve-dev)
+    shift
+    serve_dev
+    ;;
+  relay)
+    shift
+    relay
+    ;;
+  migrate)
+    shift
+    migrate
+    ;;
   *)
     exec "$@"
     ;;
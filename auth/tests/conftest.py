@@ -0,0 +1,12 @@
+import os
+
+# settings are read when app modules are first imported
+for name, value in {
+    "PG_USER": "auth",
+    "PG_PASSWORD": "auth",
+    "PG_DB": "auth",
+    "SECRET_KEY": "secret",
+    "KAFKA_USER_STREAMING_TOPIC": "user-streaming",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(name, value)
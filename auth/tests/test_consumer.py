@@ -0,0 +1,47 @@
+import asyncio
+
+from app.consumer import BackgroundConsumer
+
+
+async def test_background_consumer_restarts_after_failures():
+    runs = []
+    stop = asyncio.Event()
+
+    async def consume(on_started):
+        runs.append(len(runs))
+        if len(runs) < 3:
+            raise ConnectionError("kafka is down")
+        on_started()
+        await stop.wait()
+
+    consumer = BackgroundConsumer("test", consume, min_backoff=0.01, max_backoff=0.02)
+    consumer.start()
+    while not consumer.up:
+        await asyncio.sleep(0.01)
+
+    assert (runs, consumer.restarts) == ([0, 1, 2], 2)
+    stop.set()
+    while consumer.up:
+        await asyncio.sleep(0.01)
+    assert consumer.restarts == 3
+    await consumer.stop()
+
+
+async def test_background_consumer_is_down_until_started():
+    started = asyncio.Event()
+
+    async def consume(on_started):
+        await started.wait()
+        on_started()
+        await asyncio.Event().wait()
+
+    consumer = BackgroundConsumer("test", consume)
+    consumer.start()
+    await asyncio.sleep(0.01)
+    assert not consumer.up
+
+    started.set()
+    await asyncio.sleep(0.01)
+    assert consumer.up
+    await consumer.stop()
+    assert consumer.restarts == 0
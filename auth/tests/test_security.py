@@ -0,0 +1,39 @@
+import asyncio
+
+from app.security import PasswordHasher, PasswordHasherBusy, get_password_hash
+
+
+async def test_password_hasher_rejects_jobs_beyond_max_pending():
+    password_hasher = PasswordHasher(max_workers=1, max_pending=2)
+    hashed_password = get_password_hash("secret")
+
+    results = await asyncio.gather(
+        *(password_hasher.verify("secret", hashed_password) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert results[:2] == [True, True]
+    assert isinstance(results[2], PasswordHasherBusy)
+    # finished jobs free their slots
+    assert await password_hasher.verify("wrong", hashed_password) is False
+    password_hasher.shutdown()
+
+
+async def test_password_hasher_keeps_the_event_loop_responsive():
+    password_hasher = PasswordHasher(max_workers=1, max_pending=1)
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    hashed_password = await password_hasher.hash("secret")
+    ticker.cancel()
+
+    assert hashed_password.startswith("$2b$")
+    # bcrypt takes well over 10 ms, and the loop kept running meanwhile
+    assert ticks > 10
+    password_hasher.shutdown()
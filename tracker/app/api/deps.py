@@ -1,14 +1,16 @@
-from aiokafka import AIOKafkaProducer
+import httpx
 from fastapi import Depends, HTTPException
-from jose import JWTError, jwt
+from jose import JWTError
 from starlette import status
 from starlette.requests import Request
 
 from app.api.schemas import TokenData
-from app.db.models import User
-from app.db.repositories import TaskRepository, UserRepository
+from app.cache import TTLCache, UserCache, UserVersions
+from app.db.repositories import TaskReadRepository, TaskRepository, UserRepository
 from app.db.session import Database
-from app.security import oauth2_scheme
+from app.feed import TaskFeed
+from app.jobs import JobRegistry
+from app.security import PRINCIPAL_CLAIMS, Principal, decode_access_token, oauth2_scheme
 from app.settings.config import settings
 
 
@@ -24,21 +26,66 @@ def get_task_repository(db: Database = Depends(get_database, use_cache=True)) ->
     return TaskRepository(db=db)
 
 
-def get_kafka_producer(request: Request) -> AIOKafkaProducer:
-    return request.app.state.producer
+def get_task_read_repository(db: Database = Depends(get_database, use_cache=True)) -> TaskReadRepository:
+    return TaskReadRepository(db=db)
+
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    # async so it runs on the event loop: as a sync dependency it would run in the threadpool, where concurrent first
+    # requests could each build a client and leak all but the last
+    if request.app.state.http_client is None:
+        # built on first use: only the login proxy needs it, and creating its TLS context slows down worker startup
+        request.app.state.http_client = create_http_client()
+    return request.app.state.http_client
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+    )
+
+
+def get_task_feed(request: Request) -> TaskFeed:
+    return request.app.state.task_feed
+
+
+def get_job_registry(request: Request) -> JobRegistry:
+    return request.app.state.jobs
+
+
+def get_user_cache(request: Request) -> UserCache:
+    return request.app.state.user_cache
+
+
+def get_user_versions(request: Request) -> UserVersions:
+    return request.app.state.user_versions
+
+
+def get_token_cache(request: Request) -> TTLCache:
+    return request.app.state.token_cache
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     user_repository: UserRepository = Depends(get_user_repository),
-) -> User:
+    user_cache: UserCache = Depends(get_user_cache),
+    user_versions: UserVersions = Depends(get_user_versions),
+    token_cache: TTLCache = Depends(get_token_cache),
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if token is None:
+        raise credentials_exception
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token, token_cache)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -46,13 +93,24 @@ async def get_current_user(
     except JWTError as exc:
         raise credentials_exception
 
-    user = await user_repository.get_user_by_username(username=token_data.username)
+    if all(claim in payload for claim in PRINCIPAL_CLAIMS):
+        try:
+            principal = Principal.from_claims(payload)
+        except (TypeError, ValueError):
+            raise credentials_exception
+        if user_versions.is_current(principal.public_id, payload["ver"], payload["iat"]):
+            return principal
+
+    user = user_cache.get_by_username(token_data.username)
     if user is None:
-        raise credentials_exception
-    return user
+        user = await user_repository.get_user_by_username(username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        user_cache.add(user)
+    return Principal.from_user(user)
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
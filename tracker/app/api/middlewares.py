@@ -0,0 +1,68 @@
+import time
+from asyncio import current_task
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.session import Database
+from app.metrics import Histogram
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+
+
+class UnitOfWorkMiddleware:
+    """Run each HTTP request in one database unit of work, so its repository calls share a connection."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db: Database = scope["app"].state.db
+        task = current_task()
+
+        async def send_and_release(message: Message) -> None:
+            # streamed bodies (exports, the task feed) can outlive the request by far; don't hold a connection for them.
+            # Streaming responses send from a child task, hence the captured request task.
+            if message["type"] == "http.response.start":
+                await db.end_unit_of_work(task)
+            await send(message)
+
+        async with db.unit_of_work():
+            await self.app(scope, receive, send_and_release)
+
+
+class MetricsMiddleware:
+    """Record request latency labelled by the matched route template rather than the raw path."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started_at,
+                method=scope["method"],
+                route=route.path if route is not None else "unmatched",
+                status=str(status_code),
+            )
@@ -0,0 +1,14 @@
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for content that is already plain data, encoded with orjson.
+
+    UUIDs and enums are encoded as their string values, the same as FastAPI's own encoding.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
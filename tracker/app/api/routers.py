@@ -1,19 +1,34 @@
+import csv
+import io
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+from uuid import UUID
+
 import httpx
-from aiokafka import AIOKafkaProducer
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.background import BackgroundTask
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, RedirectResponse, Response
-from starlette.templating import Jinja2Templates, _TemplateResponse
+from starlette.responses import (
+    HTMLResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 
 from app.api.deps import (
     get_current_active_user,
-    get_kafka_producer,
+    get_http_client,
+    get_job_registry,
+    get_task_feed,
+    get_task_read_repository,
     get_task_repository,
 )
-from app.api.schemas import TaskRead, TaskWrite
-from app.db.models import Role, Task, User
-from app.db.repositories import TaskRepository
+from app.api.responses import FastJSONResponse
+from app.api.schemas import ExportFormat, JobRead, TaskPage, TaskRead, TaskWrite
+from app.api.serializers import serialize_task
+from app.db.models import Job, Role, Task, TaskStatus
+from app.db.repositories import TaskReadRepository, TaskRepository, TaskRow
 from app.events.task import (
     TaskAssigned,
     TaskAssignedData,
@@ -23,31 +38,57 @@ from app.events.task import (
     TaskStream,
     TaskUpdated,
 )
+from app.feed import TaskFeed, iter_task_feed
+from app.jobs import JobRegistry, ReportProgress
+from app.metrics import CONTENT_TYPE, REGISTRY
+from app.security import Principal
 from app.settings.config import settings
 
-router = APIRouter()
+if TYPE_CHECKING:
+    from starlette.templating import Jinja2Templates, _TemplateResponse
 
-templates = Jinja2Templates(directory="app/api/templates")
+router = APIRouter()
 
 CAN_SHUFFLE_TASKS = (Role.ADMIN, Role.MANAGER)
 CAN_ADD_TASKS = (Role.ADMIN, Role.MANAGER, Role.ACCOUNTANT, Role.MANAGER)
 CAN_VIEW_TASKS = (Role.ADMIN, Role.MANAGER, Role.ACCOUNTANT, Role.MANAGER)
 
 
+@lru_cache
+def get_templates() -> "Jinja2Templates":
+    # jinja2 is imported when the first page is rendered instead of at every worker start
+    from starlette.templating import Jinja2Templates
+
+    return Jinja2Templates(directory="app/api/templates")
+
+
 @router.get("/")
 async def redirect_to_login() -> RedirectResponse:
     return RedirectResponse("/login", status_code=302)
 
 
+@router.get("/ready", include_in_schema=False)
+async def read_readiness(request: Request) -> Response:
+    # answered by whichever worker accepted the connection: ready once its startup hooks ran, until it starts draining;
+    # not ready while its user cache misses invalidations
+    ready = request.app.state.ready and request.app.state.user_cache_invalidation.up
+    return Response(status_code=200 if ready else 503)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @router.get(
     "/login",
     response_class=HTMLResponse,
     description="Login",
     name="login",
 )
-def show_login_form(request: Request) -> _TemplateResponse:
+def show_login_form(request: Request) -> "_TemplateResponse":
     context = {"request": request, "oauth_token_url": settings.OAUTH_TOKEN_URL}
-    return templates.TemplateResponse("login.html", context=context)
+    return get_templates().TemplateResponse("login.html", context=context)
 
 
 @router.get(
@@ -58,11 +99,11 @@ def show_login_form(request: Request) -> _TemplateResponse:
 )
 def get_all_tasks(
     request: Request,
-) -> _TemplateResponse:
+) -> "_TemplateResponse":
     context = {
         "request": request,
     }
-    return templates.TemplateResponse("tasks.html", context=context)
+    return get_templates().TemplateResponse("tasks.html", context=context)
 
 
 @router.get(
@@ -73,11 +114,11 @@ def get_all_tasks(
 )
 def get_current_user(
     request: Request,
-) -> _TemplateResponse:
+) -> "_TemplateResponse":
     context = {
         "request": request,
     }
-    return templates.TemplateResponse("tasks_my.html", context=context)
+    return get_templates().TemplateResponse("tasks_my.html", context=context)
 
 
 @router.post(
@@ -87,36 +128,95 @@ def get_current_user(
 )
 async def get_auth_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-):
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            settings.OAUTH_TOKEN_URL,
-            data={"username": form_data.username, "password": form_data.password},
-        )
-    response = Response(
-        content=response.content,
-        media_type="application/json",
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+) -> StreamingResponse:
+    request = http_client.build_request(
+        "POST",
+        settings.OAUTH_TOKEN_URL,
+        data={"username": form_data.username, "password": form_data.password},
+    )
+    response = await http_client.send(request, stream=True)
+    return StreamingResponse(
+        response.aiter_bytes(),
+        media_type=response.headers.get("content-type", "application/json"),
         status_code=response.status_code,
+        background=BackgroundTask(response.aclose),
     )
-    return response
 
 
-@router.get("/api/tasks", response_model=list[TaskRead])
+@router.get("/api/tasks", response_model=TaskPage)
 async def read_all_tasks(
-    task_repository: TaskRepository = Depends(get_task_repository),
-    current_user: User = Depends(get_current_active_user),
-):
+    after_id: int | None = None,
+    limit: int = Query(settings.TASK_PAGE_SIZE, ge=1, le=settings.TASK_PAGE_SIZE_MAX),
+    status: TaskStatus | None = None,
+    assignee_id: UUID | None = None,
+    task_repository: TaskReadRepository = Depends(get_task_read_repository),
+    current_user: Principal = Depends(get_current_active_user),
+) -> TaskPage:
     if current_user.role not in CAN_VIEW_TASKS:
         raise HTTPException(status_code=403, detail="Forbidden")
-    return await task_repository.get_all_tasks()
+    tasks = await task_repository.get_tasks(limit + 1, after_id=after_id, status=status, assignee_id=assignee_id)
+    return paginate(tasks, limit)
 
 
-@router.get("/api/tasks/my", response_model=list[TaskRead])
+@router.get("/api/tasks/my", response_model=TaskPage)
 async def read_tasks_my(
-    task_repository: TaskRepository = Depends(get_task_repository),
-    current_user: User = Depends(get_current_active_user),
-):
-    return await task_repository.get_tasks_assigned_to_user(current_user.public_id)
+    after_id: int | None = None,
+    limit: int = Query(settings.TASK_PAGE_SIZE, ge=1, le=settings.TASK_PAGE_SIZE_MAX),
+    status: TaskStatus | None = None,
+    task_repository: TaskReadRepository = Depends(get_task_read_repository),
+    current_user: Principal = Depends(get_current_active_user),
+) -> TaskPage:
+    tasks = await task_repository.get_tasks(
+        limit + 1, after_id=after_id, status=status, assignee_id=current_user.public_id
+    )
+    return paginate(tasks, limit)
+
+
+@router.get(
+    "/api/tasks/feed",
+    description="Server-sent task changes: all tasks, or only the current user's with mine=true",
+    name="tasks-feed",
+)
+async def read_task_feed(
+    mine: bool = False,
+    task_feed: TaskFeed = Depends(get_task_feed),
+    task_repository: TaskReadRepository = Depends(get_task_read_repository),
+    current_user: Principal = Depends(get_current_active_user),
+) -> StreamingResponse:
+    if not mine and current_user.role not in CAN_VIEW_TASKS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    if mine:
+        # the page already shows these, and is told when one of them is reassigned to someone else
+        shown = await task_repository.get_open_task_public_ids(current_user.public_id)
+        stream = iter_task_feed(task_feed, current_user.public_id, shown)
+    else:
+        stream = iter_task_feed(task_feed, None)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/api/tasks/export",
+    description="Stream all tasks as NDJSON or CSV",
+    name="export-tasks",
+)
+async def export_tasks(
+    format: ExportFormat = ExportFormat.NDJSON,
+    task_repository: TaskReadRepository = Depends(get_task_read_repository),
+    current_user: Principal = Depends(get_current_active_user),
+) -> StreamingResponse:
+    if current_user.role not in CAN_VIEW_TASKS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    tasks = task_repository.stream_tasks(chunk_size=settings.TASK_EXPORT_CHUNK_SIZE)
+    if format == ExportFormat.CSV:
+        return StreamingResponse(iter_tasks_csv(tasks), media_type="text/csv")
+    return StreamingResponse(iter_tasks_ndjson(tasks), media_type="application/x-ndjson")
 
 
 @router.post(
@@ -129,20 +229,35 @@ async def read_tasks_my(
 async def create_task(
     task_to_create: TaskWrite,
     task_repository: TaskRepository = Depends(get_task_repository),
-    current_user: User = Depends(get_current_active_user),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Task:
     if current_user.role not in CAN_ADD_TASKS:
         raise HTTPException(status_code=403, detail="Forbidden")
-    new_task: Task = await task_repository.create_task(task_to_create)
+    return await task_repository.create_task(task_to_create, events=iter_task_created_events)
 
-    event = TaskCreated(data=TaskStream.from_orm(new_task))
-    await event.send(kafka_producer, topic=settings.KAFKA_TASK_STREAMING_TOPIC)
 
-    event = TaskAssigned(data=TaskAssignedData.from_orm(new_task))
-    await event.send(kafka_producer, topic=settings.KAFKA_TASK_LIFECYCLE_TOPIC)
-
-    return new_task
+@router.post(
+    "/api/tasks/bulk",
+    description="Register a batch of new tasks",
+    name="create-tasks-bulk",
+    response_model=list[TaskRead],
+    status_code=201,
+)
+async def create_tasks_bulk(
+    tasks_to_create: list[TaskWrite],
+    task_repository: TaskRepository = Depends(get_task_repository),
+    current_user: Principal = Depends(get_current_active_user),
+) -> list[Task]:
+    if current_user.role not in CAN_ADD_TASKS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not tasks_to_create:
+        return []
+    if len(tasks_to_create) > settings.TASK_BULK_CREATE_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Can't create more than {settings.TASK_BULK_CREATE_MAX_SIZE} tasks at once",
+        )
+    return await task_repository.create_tasks(tasks_to_create, events=iter_task_created_events)
 
 
 @router.post(
@@ -154,38 +269,105 @@ async def create_task(
 async def complete_task(
     task_id: int,
     task_repository: TaskRepository = Depends(get_task_repository),
-    current_user: User = Depends(get_current_active_user),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Task:
-    task = await task_repository.complete_task(task_id, current_user)
-
-    event = TaskUpdated(data=TaskStream.from_orm(task))
-    await event.send(kafka_producer, topic=settings.KAFKA_TASK_STREAMING_TOPIC)
-
-    event = TaskCompleted(data=TaskCompletedData.from_orm(task))
-    await event.send(kafka_producer, topic=settings.KAFKA_TASK_LIFECYCLE_TOPIC)
-
-    return task
+    return await task_repository.complete_task(task_id, current_user, events=iter_task_completed_events)
 
 
 @router.post(
     "/api/tasks/shuffle",
     description="Shuffle tasks",
     name="shuffle-task",
+    response_model=JobRead,
+    status_code=202,
 )
 async def shuffle_task(
     task_repository: TaskRepository = Depends(get_task_repository),
-    current_user: User = Depends(get_current_active_user),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
-) -> None:
+    current_user: Principal = Depends(get_current_active_user),
+    jobs: JobRegistry = Depends(get_job_registry),
+) -> Job:
     if current_user.role not in CAN_SHUFFLE_TASKS:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    updated_tasks: Task = await task_repository.shuffle_tasks()
+    async def shuffle(report_progress: ReportProgress) -> None:
+        async for updated_tasks in task_repository.iter_shuffled_tasks(
+            batch_size=settings.TASK_SHUFFLE_BATCH_SIZE, events=iter_task_shuffled_events
+        ):
+            await report_progress(len(updated_tasks))
+
+    return await jobs.submit(shuffle)
 
-    for task in updated_tasks:
-        event = TaskUpdated(data=TaskStream.from_orm(task))
-        await event.send(kafka_producer, topic=settings.KAFKA_TASK_STREAMING_TOPIC)
 
-        event = TaskAssigned(data=TaskAssignedData.from_orm(task))
-        await event.send(kafka_producer, topic=settings.KAFKA_TASK_LIFECYCLE_TOPIC)
+@router.get(
+    "/api/tasks/shuffle/{job_id}",
+    description="Get shuffle job status",
+    name="shuffle-task-status",
+    response_model=JobRead,
+)
+async def read_shuffle_task_status(
+    job_id: UUID,
+    current_user: Principal = Depends(get_current_active_user),
+    jobs: JobRegistry = Depends(get_job_registry),
+) -> Job:
+    if current_user.role not in CAN_SHUFFLE_TASKS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def iter_tasks_ndjson(tasks: AsyncIterator[list[TaskRow]]) -> AsyncIterator[str]:
+    async for chunk in tasks:
+        yield "".join(TaskRead.from_orm(task).json() + "\n" for task in chunk)
+
+
+async def iter_tasks_csv(tasks: AsyncIterator[list[TaskRow]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "public_id", "description", "status", "assignee_public_id", "assignee_username"])
+    async for chunk in tasks:
+        for task in chunk:
+            writer.writerow(
+                [
+                    task.id,
+                    task.public_id,
+                    task.description,
+                    task.status.value,
+                    task.assignee.public_id,
+                    task.assignee.username,
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_task_shuffled_events(task: Task) -> Iterator[tuple[TaskUpdated | TaskAssigned, str]]:
+    yield TaskUpdated(data=TaskStream.from_orm(task)), settings.KAFKA_TASK_STREAMING_TOPIC
+    yield TaskAssigned(data=TaskAssignedData.from_orm(task)), settings.KAFKA_TASK_LIFECYCLE_TOPIC
+
+
+def iter_task_created_events(task: Task) -> Iterator[tuple[TaskCreated | TaskAssigned, str]]:
+    yield TaskCreated(data=TaskStream.from_orm(task)), settings.KAFKA_TASK_STREAMING_TOPIC
+    yield TaskAssigned(data=TaskAssignedData.from_orm(task)), settings.KAFKA_TASK_LIFECYCLE_TOPIC
+
+
+def iter_task_completed_events(task: Task) -> Iterator[tuple[TaskUpdated | TaskCompleted, str]]:
+    yield TaskUpdated(data=TaskStream.from_orm(task)), settings.KAFKA_TASK_STREAMING_TOPIC
+    yield TaskCompleted(data=TaskCompletedData.from_orm(task)), settings.KAFKA_TASK_LIFECYCLE_TOPIC
+
+
+def paginate(tasks: list[TaskRow], limit: int) -> TaskPage | FastJSONResponse:
+    """Build a page from up to ``limit + 1`` tasks; the extra one only signals that there is a next page."""
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = tasks[-1].id
+    if settings.FAST_JSON_RESPONSES:
+        # returning a response skips FastAPI's response_model validation, repository rows are trusted
+        return FastJSONResponse({"items": [serialize_task(task) for task in tasks], "next_cursor": next_cursor})
+    return TaskPage(items=tasks, next_cursor=next_cursor)
@@ -1,8 +1,9 @@
+import enum
 from uuid import UUID
 
 from pydantic import BaseModel
 
-from app.db.models import TaskStatus
+from app.db.models import JobStatus, TaskStatus
 
 
 class Token(BaseModel):
@@ -19,6 +20,8 @@ class UserWrite(BaseModel):
     username: str
     is_active: bool
     role: str
+    # required: an event without it can't be ordered against the state already stored, so it is rejected
+    version: int
 
 
 class UserRead(BaseModel):
@@ -45,3 +48,23 @@ class TaskRead(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class JobRead(BaseModel):
+    id: UUID
+    status: JobStatus
+    processed: int
+    error: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class TaskPage(BaseModel):
+    items: list[TaskRead]
+    next_cursor: int | None = None
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
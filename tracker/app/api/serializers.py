@@ -0,0 +1,42 @@
+from operator import attrgetter
+from typing import Any, Callable
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+
+from app.api.schemas import TaskRead
+
+Serializer = Callable[[Any], dict[str, Any]]
+
+
+def compile_serializer(model: type[BaseModel]) -> Serializer:
+    """Build a function that copies the fields of ``model`` straight off an ORM object.
+
+    Unlike ``model.from_orm`` nothing is validated, so it is only meant for trusted repository output.
+    """
+    getters: list[tuple[str, Callable[[Any], Any]]] = []
+    for name, field in model.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            if field.shape != SHAPE_SINGLETON:
+                raise TypeError(f"{model.__name__}.{name}: only single nested models are supported")
+            getters.append((name, nested_getter(name, compile_serializer(field.type_))))
+        else:
+            getters.append((name, attrgetter(name)))
+
+    def serialize(obj: Any) -> dict[str, Any]:
+        return {name: get(obj) for name, get in getters}
+
+    return serialize
+
+
+def nested_getter(name: str, serialize: Serializer) -> Callable[[Any], dict[str, Any] | None]:
+    get = attrgetter(name)
+
+    def get_nested(obj: Any) -> dict[str, Any] | None:
+        value = get(obj)
+        return serialize(value) if value is not None else None
+
+    return get_nested
+
+
+serialize_task = compile_serializer(TaskRead)
@@ -0,0 +1,113 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+from uuid import UUID
+
+from app.db.models import User
+from app.metrics import Counter, Gauge
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+CACHE_HITS = Counter("cache_hits_total", "Number of cache hits", ("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "Number of cache misses", ("cache",))
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Number of entries evicted to respect cache size", ("cache",))
+CACHE_SIZE = Gauge("cache_size", "Number of entries currently held in cache", ("cache",))
+
+
+class TTLCache(Generic[K, V]):
+    """LRU cache whose entries also expire ``ttl`` seconds after they were stored."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        CACHE_SIZE.set_function(lambda: len(self._entries), cache=name)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._timer():
+            if entry is not None:
+                del self._entries[key]
+            CACHE_MISSES.inc(cache=self.name)
+            return None
+        self._entries.move_to_end(key)
+        CACHE_HITS.inc(cache=self.name)
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        expires_at = self._timer() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(cache=self.name)
+
+    def pop(self, key: K) -> V | None:
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._by_username: TTLCache[str, User] = TTLCache("user_by_username", maxsize, ttl)
+        self._by_public_id: TTLCache[UUID, User] = TTLCache("user_by_public_id", maxsize, ttl)
+
+    def get_by_username(self, username: str) -> User | None:
+        return self._by_username.get(username)
+
+    def get_by_public_id(self, public_id: UUID) -> User | None:
+        return self._by_public_id.get(public_id)
+
+    def add(self, user: User) -> None:
+        self._by_username.set(user.username, user)
+        self._by_public_id.set(user.public_id, user)
+
+    def invalidate(self, public_id: UUID, username: str | None = None) -> None:
+        user = self._by_public_id.pop(public_id)
+        if user is not None:
+            self._by_username.pop(user.username)
+        if username is not None:
+            self._by_username.pop(username)
+
+    def clear(self) -> None:
+        self._by_username.clear()
+        self._by_public_id.clear()
+
+
+class UserVersions:
+    """Tracks user changes seen on the user stream so token claims can be checked for staleness."""
+
+    def __init__(self, timer: Callable[[], float] = time.time) -> None:
+        self._timer = timer
+        self.started_at = timer()
+        self._versions: dict[UUID, int] = {}
+        self._changed_at: dict[UUID, float] = {}
+
+    def update(self, public_id: UUID, version: int | None = None) -> None:
+        if version is None:
+            # without a version only the time we saw the change can tell older tokens apart
+            self._changed_at[public_id] = self._timer()
+        else:
+            self._versions[public_id] = max(version, self._versions.get(public_id, version))
+
+    def restart(self) -> None:
+        """Start listening again: changes made while nobody listened are unknown, like those before the first start."""
+        self.started_at = self._timer()
+
+    def is_current(self, public_id: UUID, version: int, issued_at: float) -> bool:
+        # changes made before this process started listening are unknown, so older tokens are never trusted
+        if issued_at <= self.started_at:
+            return False
+        if version < self._versions.get(public_id, version):
+            return False
+        changed_at = self._changed_at.get(public_id)
+        return changed_at is None or issued_at > changed_at
@@ -0,0 +1,171 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import msgpack
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+
+from app.settings.config import EventCodecEnum, settings
+
+CONTENT_TYPE_HEADER = "content-type"
+SCHEMA_HEADER = "schema"
+
+Headers = list[tuple[str, bytes]]
+Fields = list[Any]  # field names, or {"name": ..., "fields": [...]} for nested records
+
+
+class DecodeError(Exception):
+    pass
+
+
+class SchemaRegistry:
+    """Versioned record layouts stored as ``<root>/<subject>/<version>.json`` files."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._schemas: dict[tuple[str, int], Fields] = {}
+        self._versions: dict[tuple[str, str], int] = {}
+
+    def get(self, subject: str, version: int) -> Fields:
+        key = (subject, version)
+        if key not in self._schemas:
+            path = self.root / subject / f"{version}.json"
+            self._schemas[key] = json.loads(path.read_text())["fields"]
+        return self._schemas[key]
+
+    def resolve(self, subject: str, record: dict[str, Any]) -> tuple[int, Fields]:
+        """Return the version matching the record layout, registering a new one if there is none."""
+        fields = describe(record)
+        key = (subject, repr(fields))
+        version = self._versions.get(key)
+        if version is None:
+            version = self._find(subject, fields) or self._register(subject, fields)
+            self._versions[key] = version
+        return version, fields
+
+    def _find(self, subject: str, fields: Fields) -> int | None:
+        for path in (self.root / subject).glob("*.json"):
+            if self.get(subject, int(path.stem)) == fields:
+                return int(path.stem)
+        return None
+
+    def _register(self, subject: str, fields: Fields) -> int:
+        directory = self.root / subject
+        directory.mkdir(parents=True, exist_ok=True)
+        version = max((int(path.stem) for path in directory.glob("*.json")), default=0) + 1
+        while True:
+            try:
+                # exclusive create: another producer may be registering the same subject concurrently
+                with open(directory / f"{version}.json", "x") as file:
+                    json.dump({"subject": subject, "version": version, "fields": fields}, file, indent=2)
+            except FileExistsError:
+                if self.get(subject, version) == fields:
+                    return version
+                version += 1
+                continue
+            logger.info("Registered schema {} version {}", subject, version)
+            self._schemas[(subject, version)] = fields
+            return version
+
+
+class JsonCodec:
+    content_type = "application/json"
+
+    def encode(self, record: dict[str, Any], subject: str) -> tuple[bytes, Headers]:
+        return json.dumps(record).encode(), []
+
+    def decode(self, payload: bytes, headers: dict[str, bytes]) -> dict[str, Any]:
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    content_type = "application/msgpack"
+
+    def encode(self, record: dict[str, Any], subject: str) -> tuple[bytes, Headers]:
+        return msgpack.packb(record), []
+
+    def decode(self, payload: bytes, headers: dict[str, bytes]) -> dict[str, Any]:
+        return msgpack.unpackb(payload)
+
+
+class SchemaCodec:
+    """Msgpack arrays of field values; field names live in the schema registry instead of every message."""
+
+    content_type = "application/vnd.popug.record+msgpack"
+
+    def __init__(self, registry: SchemaRegistry) -> None:
+        self.registry = registry
+
+    def encode(self, record: dict[str, Any], subject: str) -> tuple[bytes, Headers]:
+        version, fields = self.registry.resolve(subject, record)
+        return msgpack.packb(pack(record, fields)), [(SCHEMA_HEADER, f"{subject}/{version}".encode())]
+
+    def decode(self, payload: bytes, headers: dict[str, bytes]) -> dict[str, Any]:
+        subject, version = headers[SCHEMA_HEADER].decode().rsplit("/", 1)
+        return unpack(msgpack.unpackb(payload), self.registry.get(subject, int(version)))
+
+
+Codec = JsonCodec | MsgpackCodec | SchemaCodec
+
+registry = SchemaRegistry(settings.EVENT_SCHEMA_REGISTRY_PATH)
+CODECS: dict[str, Codec] = {
+    JsonCodec.content_type: JsonCodec(),
+    MsgpackCodec.content_type: MsgpackCodec(),
+    SchemaCodec.content_type: SchemaCodec(registry),
+}
+
+
+@lru_cache
+def get_event_codec(name: EventCodecEnum = settings.KAFKA_EVENT_CODEC) -> Codec:
+    content_type = {
+        EventCodecEnum.JSON: JsonCodec.content_type,
+        EventCodecEnum.MSGPACK: MsgpackCodec.content_type,
+        EventCodecEnum.SCHEMA: SchemaCodec.content_type,
+    }[name]
+    return CODECS[content_type]
+
+
+def encode_event(event: Any, codec: Codec) -> tuple[bytes, Headers]:
+    """Encode an event and copy its scalar metadata (event_name, event_version, ...) into message headers."""
+    record = jsonable_encoder(event)
+    value, codec_headers = codec.encode(record, type(event).__name__)
+    headers = [(key, str(field).encode()) for key, field in record.items() if not isinstance(field, (dict, list))]
+    headers.append((CONTENT_TYPE_HEADER, codec.content_type.encode()))
+    return value, headers + codec_headers
+
+
+def decode_message(value: bytes, headers: Headers) -> dict[str, Any]:
+    """Decode a message with the codec named in its content-type header; messages without one are JSON."""
+    headers_by_name = dict(headers)
+    content_type = headers_by_name.get(CONTENT_TYPE_HEADER, JsonCodec.content_type.encode()).decode()
+    codec = CODECS.get(content_type)
+    if codec is None:
+        raise DecodeError(f"Unsupported content type {content_type}")
+    try:
+        return codec.decode(value, headers_by_name)
+    except (KeyError, OSError, TypeError, ValueError) as exc:
+        raise DecodeError(str(exc)) from exc
+
+
+def describe(record: dict[str, Any]) -> Fields:
+    return [
+        {"name": key, "fields": describe(value)} if isinstance(value, dict) else key for key, value in record.items()
+    ]
+
+
+def pack(record: dict[str, Any], fields: Fields) -> list[Any]:
+    return [
+        pack(record[field["name"]], field["fields"]) if isinstance(field, dict) else record[field] for field in fields
+    ]
+
+
+def unpack(values: list[Any], fields: Fields) -> dict[str, Any]:
+    record = {}
+    for field, value in zip(fields, values):
+        if isinstance(field, dict):
+            record[field["name"]] = unpack(value, field["fields"])
+        else:
+            record[field] = value
+    return record
@@ -1,52 +1,307 @@
-import json
-from collections import defaultdict
+import asyncio
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Awaitable, Callable
+from uuid import UUID
 
 import aiorun
-from aiokafka import AIOKafkaConsumer, ConsumerRecord
+from aiokafka import (
+    AIOKafkaConsumer,
+    ConsumerRebalanceListener,
+    ConsumerRecord,
+    TopicPartition,
+)
 from loguru import logger
+from pydantic import ValidationError
 
-from app.api.schemas import UserWrite
-from app.db.repositories import UserRepository
+from app.api.schemas import TaskRead, UserWrite
+from app.cache import UserCache, UserVersions
+from app.codecs import DecodeError, decode_message
+from app.db.repositories import TaskRepository, UserRepository
 from app.db.session import Database
+from app.feed import TaskFeed
+from app.metrics import Counter, Gauge, Histogram, start_metrics_server
 from app.settings.config import settings
 from app.settings.logger import configure_logger
 
+# CUD events carrying the full user state, applied as versioned upserts
+USER_STATE_EVENTS = (b"user.created", b"user.updated")
 
-async def main():
+CONSUMED_MESSAGES = Counter("kafka_consumer_messages_total", "Messages consumed", ("topic",))
+BATCH_DURATION = Histogram("kafka_consumer_batch_duration_seconds", "Time to apply and commit a fetched batch")
+CONSUMER_LAG = Gauge("kafka_consumer_lag", "Messages behind the partition highwater mark", ("topic", "partition"))
+CONSUMER_RESTARTS = Counter(
+    "background_consumer_restarts_total",
+    "Times a consumer running inside the server was restarted after it stopped",
+    ("consumer",),
+)
+
+
+class DrainOnRevoke(ConsumerRebalanceListener):
+    """Let the batch in flight finish and commit before partitions move to another worker."""
+
+    def __init__(self, in_flight: asyncio.Lock) -> None:
+        self.in_flight = in_flight
+
+    async def on_partitions_revoked(self, revoked: set[TopicPartition]) -> None:
+        async with self.in_flight:
+            logger.info("Partitions revoked: {}", sorted(revoked))
+
+    async def on_partitions_assigned(self, assigned: set[TopicPartition]) -> None:
+        logger.info("Partitions assigned: {}", sorted(assigned))
+
+
+async def main(worker: int = 0):
     db = Database(
         db_connect_url=settings.database_connection_url,
+        name="consumer",
         echo=settings.DEBUG,
+        **settings.database_pool_options,
     )
     user_repository = UserRepository(db)
     consumer = AIOKafkaConsumer(
-        settings.KAFKA_USER_STREAMING_TOPIC,
         bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
         group_id=settings.KAFKA_GROUP_ID,
+        enable_auto_commit=False,
+        max_poll_records=settings.KAFKA_CONSUMER_BATCH_SIZE,
     )
+    in_flight = asyncio.Lock()
+    metrics_server = None
+    if settings.KAFKA_CONSUMER_METRICS_PORT is not None:
+        metrics_server = await start_metrics_server(settings.KAFKA_CONSUMER_METRICS_PORT + worker)
     await consumer.start()
+    consumer.subscribe([settings.KAFKA_USER_STREAMING_TOPIC], listener=DrainOnRevoke(in_flight))
+    reported_at = time.monotonic()
     try:
-        async for msg in consumer:
-            headers = get_headers(msg)
-            if "user.created" in headers.get("event_name", []):
-                logger.debug("Got message {}", msg)
-                await user_repository.create_new_user(UserWrite.parse_obj(get_data(msg)))
+        while True:
+            async with in_flight:
+                batches = await consumer.getmany(
+                    timeout_ms=settings.KAFKA_CONSUMER_BATCH_TIMEOUT_MS,
+                    max_records=settings.KAFKA_CONSUMER_BATCH_SIZE,
+                )
+                if batches:
+                    logger.debug("Got {} messages", sum(len(messages) for messages in batches.values()))
+                    started_at = time.perf_counter()
+                    # partitions are independent, so each one is applied concurrently on its own connection;
+                    # messages keyed by public_id stay in order within their partition
+                    await asyncio.gather(
+                        *(upsert_user_states(user_repository, messages) for messages in batches.values())
+                    )
+                    await consumer.commit()
+                    BATCH_DURATION.observe(time.perf_counter() - started_at)
+                    record_consumed(consumer, batches)
+
+            if time.monotonic() - reported_at >= settings.KAFKA_CONSUMER_LAG_REPORT_INTERVAL:
+                logger.info("Consumer lag by partition: {}", await get_partition_lag(consumer))
+                reported_at = time.monotonic()
     finally:
         await consumer.stop()
         await db.disconnect()
+        if metrics_server is not None:
+            metrics_server.close()
+
+
+async def upsert_user_states(user_repository: UserRepository, messages: list[ConsumerRecord]) -> None:
+    users = get_user_states(messages)
+    if users:
+        await user_repository.upsert_users(users)
+
+
+def record_consumed(consumer: AIOKafkaConsumer, batches: dict[TopicPartition, list[ConsumerRecord]]) -> None:
+    for partition, messages in batches.items():
+        CONSUMED_MESSAGES.inc(len(messages), topic=partition.topic)
+        highwater = consumer.highwater(partition)
+        if highwater is not None:
+            lag = highwater - messages[-1].offset - 1
+            CONSUMER_LAG.set(lag, topic=partition.topic, partition=str(partition.partition))
+
+
+async def get_partition_lag(consumer: AIOKafkaConsumer) -> dict[str, int]:
+    lag = {}
+    for partition in sorted(consumer.assignment()):
+        highwater = consumer.highwater(partition)
+        if highwater is not None:
+            partition_lag = highwater - await consumer.position(partition)
+            CONSUMER_LAG.set(partition_lag, topic=partition.topic, partition=str(partition.partition))
+            lag[f"{partition.topic}-{partition.partition}"] = partition_lag
+    return lag
+
+
+def run_worker(number: int, consume: Callable[[int], Awaitable[None]] = main) -> None:
+    configure_logger(settings)
+    # a worker whose main() failed must exit, or the supervisor never sees it die and its partitions stall
+    aiorun.run(consume(number), use_uvloop=True, stop_on_unhandled_errors=True)
+
+
+def supervise(workers: int, consume: Callable[[int], Awaitable[None]] = main) -> None:
+    """Run workers in separate processes of the same consumer group, restarting any that die."""
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    stopping = False
+
+    def start_worker(number: int) -> None:
+        process = context.Process(target=run_worker, args=(number, consume), name=f"tracker-consumer-{number}")
+        process.start()
+        processes[process.sentinel] = (number, process)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for _, process in list(processes.values()):
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for number in range(workers):
+        start_worker(number)
+    logger.info("Started {} consumer workers", workers)
+
+    while processes:
+        for sentinel in wait(list(processes)):
+            number, process = processes.pop(sentinel)
+            if not stopping:
+                logger.warning("Consumer worker {} exited with code {}, restarting", number, process.exitcode)
+                start_worker(number)
+
+
+class BackgroundConsumer:
+    """Keeps a consumer running inside a server process, restarting it with backoff.
+
+    ``consume`` calls ``on_started`` once it is subscribed; ``up`` is true from then until it stops.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        consume: Callable[[Callable[[], None]], Awaitable[None]],
+        min_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.consume = consume
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.up = False
+        self.restarts = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def _mark_up(self) -> None:
+        self.up = True
+
+    async def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            try:
+                await self.consume(self._mark_up)
+                logger.warning("{} consumer stopped", self.name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("{} consumer failed", self.name)
+            if self.up:
+                backoff = self.min_backoff
+            self.up = False
+            self.restarts += 1
+            CONSUMER_RESTARTS.inc(consumer=self.name)
+            logger.info("Restarting {} consumer in {:.1f}s", self.name, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+async def invalidate_user_cache(
+    user_cache: UserCache, user_versions: UserVersions, on_started: Callable[[], None]
+) -> None:
+    """Drop cached users and record their versions as events arrive; runs inside every server process."""
+    # no group_id: each server process has its own cache and must see every user event
+    consumer = AIOKafkaConsumer(
+        settings.KAFKA_USER_STREAMING_TOPIC,
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+    )
+    await consumer.start()
+    try:
+        # events published while no consumer was running are never seen
+        user_cache.clear()
+        user_versions.restart()
+        on_started()
+        async for msg in consumer:
+            try:
+                data = get_data(msg)
+                public_id = UUID(data["public_id"])
+                user_cache.invalidate(public_id, username=data.get("username"))
+                user_versions.update(public_id, version=data.get("version"))
+            except (DecodeError, KeyError, TypeError, ValueError) as exc:
+                logger.warning("Can't invalidate cached user from message {}: {}", msg, exc)
+    finally:
+        await consumer.stop()
+
+
+async def feed_task_changes(
+    task_feed: TaskFeed, task_repository: TaskRepository, on_started: Callable[[], None]
+) -> None:
+    """Push changed tasks to feed clients; runs inside every server process."""
+    # no group_id: every server process serves its own clients and must see every task change
+    consumer = AIOKafkaConsumer(
+        settings.KAFKA_TASK_STREAMING_TOPIC,
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+    )
+    await consumer.start()
+    try:
+        on_started()
+        while True:
+            batches = await consumer.getmany(
+                timeout_ms=settings.KAFKA_CONSUMER_BATCH_TIMEOUT_MS,
+                max_records=settings.KAFKA_CONSUMER_BATCH_SIZE,
+            )
+            changed = set()
+            for msg in (msg for messages in batches.values() for msg in messages):
+                try:
+                    public_id = UUID(get_data(msg)["public_id"])
+                except (DecodeError, KeyError, TypeError, ValueError) as exc:
+                    logger.warning("Can't feed task change from message {}: {}", msg, exc)
+                    continue
+                changed.add(public_id)
+            if changed:
+                # one read per batch gives clients the same task shape as the REST API
+                tasks = await task_repository.get_tasks_by_public_ids(changed)
+                task_feed.publish([TaskRead.from_orm(task) for task in tasks])
+    finally:
+        await consumer.stop()
 
 
-def get_headers(msg: ConsumerRecord) -> dict[str, list[str]]:
-    headers = defaultdict(list)
-    for key, value in msg.headers:
-        headers[key].append(value.decode())
-    return headers
+def get_user_states(messages: list[ConsumerRecord]) -> list[UserWrite]:
+    users = []
+    for msg in messages:
+        if not any(("event_name", event_name) in msg.headers for event_name in USER_STATE_EVENTS):
+            continue
+        try:
+            users.append(UserWrite.parse_obj(get_data(msg)))
+        except (DecodeError, ValidationError) as exc:
+            logger.warning("Skipping malformed message {}: {}", msg, exc)
+    return users
 
 
 def get_data(msg: ConsumerRecord):
-    obj = json.loads(msg.value.decode())
+    obj = decode_message(msg.value, msg.headers)
     return obj.get("data")
 
 
 if __name__ == "__main__":
     configure_logger(settings)
-    aiorun.run(main(), use_uvloop=True)
+    if settings.KAFKA_CONSUMER_WORKERS > 1:
+        supervise(settings.KAFKA_CONSUMER_WORKERS)
+    else:
+        aiorun.run(main(), use_uvloop=True, stop_on_unhandled_errors=True)
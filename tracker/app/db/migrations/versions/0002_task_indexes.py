@@ -0,0 +1,27 @@
+"""task indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2022-05-20 12:30:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_task_assignee_id_id", "task", ["assignee_id", "id"])
+    op.create_index("ix_task_open", "task", ["id"], postgresql_where=sa.text("status != 'DONE'"))
+    op.create_index("ix_user_role", "user", ["role"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_role", table_name="user")
+    op.drop_index("ix_task_open", table_name="task")
+    op.drop_index("ix_task_assignee_id_id", table_name="task")
@@ -0,0 +1,34 @@
+"""job
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2022-05-26 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from fastapi_utils.guid_type import GUID
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job",
+        sa.Column("id", GUID(), nullable=False),
+        sa.Column("status", sa.Enum("PENDING", "RUNNING", "DONE", "FAILED", name="jobstatus"), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job")
+    sa.Enum(name="jobstatus").drop(op.get_bind())
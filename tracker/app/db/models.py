@@ -2,13 +2,29 @@ import enum
 import uuid
 from datetime import datetime
 
-from fastapi_utils.guid_type import GUID
-from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Integer, String
+from fastapi_utils import guid_type
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
 
 
+class GUID(guid_type.GUID):
+    # fastapi-utils leaves cache_ok unset, which keeps every statement touching a UUID column out of the SQL
+    # compilation cache; the type holds no state, so caching is safe
+    cache_ok = True
+
+
 class Role(str, enum.Enum):
     ADMIN = "admin"
     MANAGER = "manager"
@@ -21,7 +37,8 @@ class User(Base):
     public_id = Column(GUID, unique=True, nullable=False, index=True)
     username = Column(String, unique=True, nullable=False, index=True)
     is_active = Column(Boolean(), default=True)
-    role = Column(Enum(Role), nullable=False)
+    role = Column(Enum(Role), nullable=False, index=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     def __repr__(self):
         return f"User(username={self.username}, role={self.role})"
@@ -42,5 +59,44 @@ class Task(Base):
     created_at = Column(DateTime(timezone=True), default=datetime.now)
     updated_at = Column(DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
 
+    __table_args__ = (
+        Index("ix_task_assignee_id_id", "assignee_id", "id"),
+        Index("ix_task_open", "id", postgresql_where=status != TaskStatus.DONE),
+    )
+
     def __repr__(self):
         return f"Task(description={self.description}, status={self.status})"
+
+
+class OutboxMessage(Base):
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)
+    event_name = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_outboxmessage_unsent", "id", postgresql_where=sent_at.is_(None)),)
+
+    def __repr__(self):
+        return f"OutboxMessage(event_name={self.event_name}, topic={self.topic})"
+
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job(Base):
+    # background jobs run in the worker that accepted them, but their state lives here so any worker can report it
+    id = Column(GUID, primary_key=True, default=uuid.uuid4)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    processed = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.now)
+    updated_at = Column(DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"Job(id={self.id}, status={self.status})"
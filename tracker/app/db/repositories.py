@@ -1,14 +1,160 @@
+import random
 from dataclasses import dataclass
-from uuid import UUID
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+from uuid import UUID, uuid4
 
-from sqlalchemy import func, select, update
-from sqlalchemy.orm import joinedload, selectinload
+from loguru import logger
+from sqlalchemy import (
+    Integer,
+    bindparam,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import Insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased, contains_eager, joinedload
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.selectable import TableValuedAlias
+from sqlalchemy.types import TypeEngine
 
 from app.api.schemas import TaskWrite, UserWrite
-from app.db.models import Role, Task, TaskStatus, User
+from app.db.models import (
+    GUID,
+    Job,
+    JobStatus,
+    OutboxMessage,
+    Role,
+    Task,
+    TaskStatus,
+    User,
+)
 from app.db.session import Database
+from app.security import Principal
 
 CAN_BE_TASK_ASSIGNEE = (Role.DEVELOPER, Role.ACCOUNTANT)
+SHUFFLE_BATCH_SIZE = 10_000
+
+
+class NoTaskAssignees(Exception):
+    pass
+
+
+TaskEvents = Callable[[Task], Iterable[tuple[Any, str]]]
+
+
+def random_assignee_query() -> Select:
+    """Pick a random eligible assignee by skipping a random number of rows instead of sorting the whole table."""
+    is_eligible = User.role.in_(CAN_BE_TASK_ASSIGNEE)
+    eligible_count = select(func.count(User.id)).where(is_eligible).scalar_subquery()
+    return select(User).where(is_eligible).offset(cast(func.floor(func.random() * eligible_count), Integer)).limit(1)
+
+
+def create_task_query() -> Select:
+    """Insert a task bound to the ``TaskWrite`` fields, assigned to a random eligible user, and select it joined to
+    that user; inserts nothing when there is no eligible user."""
+    assignee = random_assignee_query().cte("assignee")
+    values = {name: bindparam(name, type_=Task.__table__.c[name].type) for name in TaskWrite.__fields__}
+    inserted = (
+        insert(Task)
+        .from_select(["assignee_id", *values], select(assignee.c.public_id, *values.values()))
+        .returning(*Task.__table__.columns)
+        .cte("inserted")
+    )
+    task_alias, assignee_alias = aliased(Task, inserted), aliased(User, assignee)
+    return (
+        select(task_alias)
+        .join(assignee_alias, task_alias.assignee_id == assignee_alias.public_id)
+        .options(contains_eager(task_alias.assignee.of_type(assignee_alias)))
+    )
+
+
+def unnest_rows(columns: dict[str, TypeEngine], with_ordinality: str | None = None) -> TableValuedAlias:
+    """Rows of one array bound per column: a batch bound this way keeps the statement the same whatever its size, so
+    it is compiled once and is not capped by the 32767 bind parameters limit."""
+    arrays = {
+        name: ARRAY(PG_UUID(as_uuid=True) if isinstance(type_, GUID) else type_) for name, type_ in columns.items()
+    }
+    return (
+        func.unnest(*(cast(bindparam(name, type_=type_), type_) for name, type_ in arrays.items()))
+        .table_valued(*(column(name, type_) for name, type_ in columns.items()), with_ordinality=with_ordinality)
+        .render_derived(name="row")
+    )
+
+
+def create_tasks_query() -> Select:
+    """Insert tasks bound as one array per column, each assigned to a random eligible user, and select
+    them joined to their users in input order; inserts nothing when there is no eligible user."""
+    is_eligible = User.role.in_(CAN_BE_TASK_ASSIGNEE)
+    eligible = select(User.public_id, func.row_number().over(order_by=User.id).label("number")).where(is_eligible)
+    eligible = eligible.cte("eligible")
+    # python-side column defaults would be rendered once for the whole INSERT ... SELECT, so public ids are bound too
+    columns = {name: Task.__table__.c[name].type for name in ("public_id", *TaskWrite.__fields__)}
+    rows = unnest_rows(columns, with_ordinality="position")
+    eligible_count = select(func.count()).select_from(eligible).scalar_subquery()
+    # a CTE with random() is evaluated once per row, so every task gets exactly one pick
+    picks = select(rows, (cast(func.floor(func.random() * eligible_count), Integer) + 1).label("number")).cte("pick")
+    inserted = (
+        insert(Task)
+        .from_select(
+            ["assignee_id", *columns],
+            select(eligible.c.public_id, *(picks.c[name] for name in columns))
+            .join_from(picks, eligible, picks.c.number == eligible.c.number)
+            .order_by(picks.c.position),
+        )
+        .returning(*Task.__table__.columns)
+        .cte("inserted")
+    )
+    task_alias = aliased(Task, inserted)
+    return (
+        select(task_alias)
+        .join(task_alias.assignee)
+        .options(contains_eager(task_alias.assignee))
+        .order_by(task_alias.id)
+    )
+
+
+# built once: constructing the statement and its cache key cost more than running it
+CREATE_TASK_QUERY = create_task_query()
+CREATE_TASKS_QUERY = create_tasks_query()
+
+
+def upsert_users_query() -> Insert:
+    """Apply user states bound as one array per column idempotently: replays rewrite the same row and older versions
+    are skipped in place."""
+    columns = {name: User.__table__.c[name].type for name in UserWrite.__fields__}
+    query = postgresql.insert(User).from_select(list(columns), select(unnest_rows(columns)))
+    return query.on_conflict_do_update(
+        index_elements=[User.public_id],
+        set_={
+            "username": query.excluded.username,
+            "is_active": query.excluded.is_active,
+            "role": query.excluded.role,
+            "version": query.excluded.version,
+        },
+        where=User.version <= query.excluded.version,
+    )
+
+
+UPSERT_USERS_QUERY = upsert_users_query()
+
+
+def to_outbox_rows(events: Iterable[tuple[Any, str]]) -> list[dict[str, Any]]:
+    return [{"topic": topic, "event_name": type(event).__name__, "payload": event.json()} for event, topic in events]
+
+
+def to_outbox_messages(events: Iterable[tuple[Any, str]]) -> list[OutboxMessage]:
+    return [OutboxMessage(**row) for row in to_outbox_rows(events)]
 
 
 @dataclass
@@ -21,75 +167,206 @@ class UserRepository:
             user = await session.execute(query)
             return user.scalar()
 
-    async def create_new_user(self, user_to_create: UserWrite) -> User:
-        user = User(**user_to_create.dict())
+    async def upsert_users(self, users_to_upsert: list[UserWrite]) -> None:
+        # ON CONFLICT DO UPDATE can't touch the same row twice in one statement, so only the newest event per user
+        # is kept; for equal versions the later one wins
+        latest: dict[UUID, UserWrite] = {}
+        for user in users_to_upsert:
+            if user.public_id not in latest or latest[user.public_id].version <= user.version:
+                latest[user.public_id] = user
+        columns = {name: [getattr(user, name) for user in latest.values()] for name in UserWrite.__fields__}
         async with self.db.session() as session:
-            session.add(user)
+            await session.execute(UPSERT_USERS_QUERY, columns)
             await session.commit()
-            await session.refresh(user)
-        return user
+
+
+@dataclass(slots=True)
+class AssigneeRow:
+    public_id: UUID
+    username: str
+    is_active: bool
+    role: Role
+
+
+@dataclass(slots=True)
+class TaskRow:
+    """Read-only task with the attributes of ``TaskRead``, so both pydantic and ``serialize_task`` accept it."""
+
+    id: int
+    public_id: UUID
+    description: str
+    status: TaskStatus
+    assignee: AssigneeRow
+
+
+def task_rows_query() -> Select:
+    return (
+        select(
+            Task.id,
+            Task.public_id,
+            Task.description,
+            Task.status,
+            User.public_id,
+            User.username,
+            User.is_active,
+            User.role,
+        )
+        .join(User, Task.assignee_id == User.public_id)
+        .order_by(Task.id)
+    )
+
+
+def to_task_rows(rows: Iterable[Row], assignees: dict[UUID, AssigneeRow]) -> list[TaskRow]:
+    """Build rows of ``task_rows_query``, sharing one ``AssigneeRow`` per user the way the identity map would."""
+    tasks = []
+    for task_id, public_id, description, status, assignee_id, username, is_active, role in rows:
+        assignee = assignees.get(assignee_id)
+        if assignee is None:
+            assignee = assignees[assignee_id] = AssigneeRow(assignee_id, username, is_active, role)
+        tasks.append(TaskRow(task_id, public_id, description, status, assignee))
+    return tasks
 
 
 @dataclass
-class TaskRepository:
+class TaskReadRepository:
+    """Read-only task listings: selects only the columns they render, without ORM objects or an identity map."""
+
     db: Database
 
-    async def get_all_tasks(self) -> list[Task]:
-        query = select(Task).options(joinedload(Task.assignee, innerjoin=True)).order_by(Task.id)
+    async def get_tasks(
+        self,
+        limit: int,
+        after_id: int | None = None,
+        status: TaskStatus | None = None,
+        assignee_id: UUID | None = None,
+    ) -> list[TaskRow]:
+        query = task_rows_query().limit(limit)
+        if after_id is not None:
+            query = query.where(Task.id > after_id)
+        if status is not None:
+            query = query.where(Task.status == status)
+        if assignee_id is not None:
+            query = query.where(Task.assignee_id == assignee_id)
         async with self.db.session() as session:
-            tasks = await session.execute(query)
-            return tasks.scalars().all()
+            rows = await session.execute(query)
+            return to_task_rows(rows, {})
 
-    async def get_task_by_id(self, task_id: int) -> Task | None:
+    async def get_open_task_public_ids(self, assignee_id: UUID) -> set[UUID]:
+        query = select(Task.public_id).where(Task.assignee_id == assignee_id, Task.status != TaskStatus.DONE)
         async with self.db.session() as session:
-            query = select(Task).filter_by(id=task_id).join(Task.assignee).options(selectinload(Task.assignee))
-            task = await session.execute(query)
-            return task.scalar()
+            return set(await session.scalars(query))
 
-    async def get_tasks_assigned_to_user(self, user_public_id: UUID) -> Task | None:
+    async def stream_tasks(self, chunk_size: int) -> AsyncIterator[list[TaskRow]]:
+        """Yield all tasks ordered by id in chunks read from a server-side cursor."""
+        query = task_rows_query().execution_options(yield_per=chunk_size)
+        assignees: dict[UUID, AssigneeRow] = {}
+        async with self.db.session() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions(chunk_size):
+                yield to_task_rows(rows, assignees)
+
+
+@dataclass
+class TaskRepository:
+    db: Database
+
+    async def get_tasks_by_public_ids(self, public_ids: Iterable[UUID]) -> list[Task]:
+        query = (
+            select(Task).where(Task.public_id.in_(list(public_ids))).options(joinedload(Task.assignee, innerjoin=True))
+        )
         async with self.db.session() as session:
-            query = (
-                select(Task)
-                .options(joinedload(Task.assignee, innerjoin=True))
-                .filter_by(assignee_id=user_public_id)
-                .order_by(Task.id)
-            )
             tasks = await session.execute(query)
             return tasks.scalars().all()
 
-    async def create_task(self, task_to_create: TaskWrite) -> Task:
+    async def create_task(self, task_to_create: TaskWrite, events: TaskEvents | None = None) -> Task:
+        """Insert the task with a random assignee and return it joined to that assignee in a single statement."""
         async with self.db.session() as session:
-            random_assignee_id = (
-                select(User.public_id).where(User.role.in_(CAN_BE_TASK_ASSIGNEE)).order_by(func.random()).limit(1)
-            )
-            task = Task(assignee_id=random_assignee_id, **task_to_create.dict())
-            session.add(task)
+            task = (await session.execute(CREATE_TASK_QUERY, task_to_create.dict())).scalar_one_or_none()
+            if task is None:
+                raise NoTaskAssignees("There are no users tasks can be assigned to")
+            if events is not None:
+                session.add_all(to_outbox_messages(events(task)))
             await session.commit()
-        return await self.get_task_by_id(task.id)
+            return task
 
-    async def shuffle_tasks(self) -> list[Task]:
+    async def create_tasks(self, tasks_to_create: list[TaskWrite], events: TaskEvents | None = None) -> list[Task]:
+        """Insert tasks assigned to random eligible users with one INSERT ... SELECT over the unnested batch."""
+        columns = {name: [getattr(task, name) for task in tasks_to_create] for name in TaskWrite.__fields__}
+        columns["public_id"] = [uuid4() for _ in tasks_to_create]
         async with self.db.session() as session:
-            random_assignee_id = (
-                select(User.public_id)
-                .where(
-                    Task.id > 0,  # we need correlation to create random assignee_id for each row
-                    User.role.in_(CAN_BE_TASK_ASSIGNEE),
-                )
-                .order_by(func.random())
-                .limit(1)
-                .scalar_subquery()
-            )
-            updated_task_ids = await session.execute(
-                update(Task)
-                .where(Task.status != TaskStatus.DONE)
-                .values(assignee_id=random_assignee_id)
-                .returning(Task.id)
-            )
-            tasks = await session.execute(select(Task).where(Task.id.in_(updated_task_ids.scalars())))
+            tasks = (await session.execute(CREATE_TASKS_QUERY, columns)).scalars().all()
+            if tasks_to_create and not tasks:
+                raise NoTaskAssignees("There are no users tasks can be assigned to")
+            if events is not None:
+                outbox_rows = to_outbox_rows(chain.from_iterable(events(task) for task in tasks))
+                await session.execute(insert(OutboxMessage), outbox_rows)
             await session.commit()
-            return tasks.scalars().all()
+            return tasks
+
+    async def iter_shuffled_tasks(
+        self, batch_size: int = SHUFFLE_BATCH_SIZE, events: TaskEvents | None = None
+    ) -> AsyncIterator[list[Task]]:
+        """Reassign open tasks to random assignees with one UPDATE ... FROM unnest(...) per id-ordered batch.
 
-    async def complete_task(self, task_id: int, user: User) -> Task:
+        Events of a batch are written to the outbox in the same transaction as its UPDATE.
+        """
+        async with self.db.session() as session:
+            assignees = await session.execute(select(User.public_id).where(User.role.in_(CAN_BE_TASK_ASSIGNEE)))
+            assignee_ids = assignees.scalars().all()
+            if not assignee_ids:
+                return
+            total = await session.scalar(select(func.count(Task.id)).where(Task.status != TaskStatus.DONE))
+
+        shuffled, last_task_id = 0, 0
+        while True:
+            async with self.db.session() as session:
+                query = (
+                    select(Task.id)
+                    .where(Task.status != TaskStatus.DONE, Task.id > last_task_id)
+                    .order_by(Task.id)
+                    .limit(batch_size)
+                )
+                task_ids = (await session.execute(query)).scalars().all()
+                if not task_ids:
+                    break
+
+                # asyncpg reuses prepared statements, and the generic plan postgres switches to after five executions
+                # misjudges the unnested batch: that batch took 20+ s instead of 1 s in benchmarks.shuffle
+                await session.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"))
+                # the batch is bound as two arrays: a VALUES list costs two bind parameters per row, which are slow
+                # to compile and capped at 32767 per statement
+                assignments = (
+                    func.unnest(
+                        cast(task_ids, ARRAY(Integer)),
+                        cast([random.choice(assignee_ids) for _ in task_ids], ARRAY(PG_UUID(as_uuid=True))),
+                    )
+                    .table_valued(column("id", Integer), column("assignee_id", GUID))
+                    .render_derived(name="assignment")
+                )
+                query = (
+                    update(Task)
+                    .where(
+                        Task.id == assignments.c.id,
+                        # lets the planner range-scan the primary key instead of hashing the whole table per batch
+                        Task.id.between(task_ids[0], task_ids[-1]),
+                        Task.status != TaskStatus.DONE,
+                    )
+                    .values(assignee_id=assignments.c.assignee_id)
+                    .returning(*Task.__table__.columns)
+                )
+                query = select(Task).from_statement(query).execution_options(populate_existing=True)
+                tasks = (await session.execute(query)).scalars().all()
+                if events is not None and tasks:
+                    outbox_rows = to_outbox_rows(chain.from_iterable(events(task) for task in tasks))
+                    await session.execute(insert(OutboxMessage), outbox_rows)
+                await session.commit()
+
+            last_task_id = task_ids[-1]
+            shuffled += len(tasks)
+            logger.info("Shuffled {}/{} tasks", shuffled, total)
+            yield tasks
+
+    async def complete_task(self, task_id: int, user: Principal, events: TaskEvents | None = None) -> Task:
         async with self.db.session() as session:
             query = (
                 select(Task)
@@ -102,6 +379,73 @@ class TaskRepository:
             task = (await session.execute(query)).scalar_one()
 
             task.status = TaskStatus.DONE
-            await session.execute(query)
+            await session.flush()
+            if events is not None:
+                session.add_all(to_outbox_messages(events(task)))
             await session.commit()
             return task
+
+
+@dataclass
+class OutboxRepository:
+    db: Database
+
+    async def relay(
+        self,
+        publish: Callable[[list[OutboxMessage]], Awaitable[None]],
+        batch_size: int,
+    ) -> int:
+        """Publish the oldest unsent messages and mark them sent; returns the number of relayed messages."""
+        async with self.db.session() as session:
+            query = (
+                select(OutboxMessage)
+                .where(OutboxMessage.sent_at.is_(None))
+                .order_by(OutboxMessage.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = (await session.execute(query)).scalars().all()
+            if not messages:
+                return 0
+
+            await publish(messages)
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([message.id for message in messages]))
+                .values(sent_at=datetime.now())
+            )
+            await session.commit()
+            return len(messages)
+
+    async def delete_sent(self, older_than: timedelta) -> int:
+        """Delete messages sent more than ``older_than`` ago and return their count."""
+        async with self.db.session() as session:
+            deleted = await session.execute(
+                delete(OutboxMessage).where(OutboxMessage.sent_at < datetime.now() - older_than)
+            )
+            await session.commit()
+            return deleted.rowcount
+
+
+@dataclass
+class JobRepository:
+    db: Database
+
+    async def create_job(self) -> Job:
+        async with self.db.session() as session:
+            job = Job(id=uuid4(), status=JobStatus.PENDING, processed=0)
+            session.add(job)
+            await session.commit()
+            return job
+
+    async def get_job(self, job_id: UUID) -> Job | None:
+        async with self.db.session() as session:
+            return await session.get(Job, job_id)
+
+    async def update_job(self, job_id: UUID, **values: Any) -> None:
+        async with self.db.session() as session:
+            await session.execute(update(Job).where(Job.id == job_id).values(**values))
+            await session.commit()
+
+    async def add_processed(self, job_id: UUID, count: int) -> None:
+        await self.update_job(job_id, processed=Job.processed + count)
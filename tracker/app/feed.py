@@ -0,0 +1,140 @@
+import asyncio
+import json
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable
+from uuid import UUID
+
+from app.api.schemas import TaskRead
+from app.metrics import Counter, Gauge
+from app.settings.config import settings
+
+FEED_CLIENTS = Gauge("task_feed_clients", "Clients connected to the task feed")
+FEED_EVICTIONS = Counter("task_feed_evictions_total", "Task feed clients dropped for falling behind")
+
+
+@dataclass(eq=False)
+class Subscriber:
+    assignee_id: UUID | None  # None follows all tasks
+    queue: asyncio.Queue[str]
+    # tasks a mine subscriber shows, the only ones it is told about when they are reassigned away
+    shown: set[UUID] = field(default_factory=set)
+    evicted: bool = field(default=False)
+    closed: bool = field(default=False)
+
+
+class TaskFeed:
+    """Fans task changes out to connected clients, each with a bounded buffer of SSE messages."""
+
+    def __init__(self, buffer_size: int) -> None:
+        self.buffer_size = buffer_size
+        self._subscribers: set[Subscriber] = set()
+        self._followers: set[Subscriber] = set()
+        # mine subscribers by assignee and by the tasks they show, so a change only visits the clients it concerns
+        self._by_assignee: dict[UUID, set[Subscriber]] = {}
+        self._by_task: dict[UUID, set[Subscriber]] = {}
+        FEED_CLIENTS.set_function(lambda: len(self._subscribers))
+
+    def subscribe(self, assignee_id: UUID | None = None, shown: Iterable[UUID] = ()) -> Subscriber:
+        """Follow all tasks, or the tasks of ``assignee_id``, of which ``shown`` are the ones the client already has."""
+        subscriber = Subscriber(assignee_id=assignee_id, queue=asyncio.Queue(self.buffer_size))
+        self._subscribers.add(subscriber)
+        if assignee_id is None:
+            self._followers.add(subscriber)
+        else:
+            self._by_assignee.setdefault(assignee_id, set()).add(subscriber)
+            for public_id in shown:
+                self._show(subscriber, public_id)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber not in self._subscribers:
+            return
+        self._subscribers.discard(subscriber)
+        if subscriber.assignee_id is None:
+            self._followers.discard(subscriber)
+            return
+        self._discard(self._by_assignee, subscriber.assignee_id, subscriber)
+        for public_id in subscriber.shown:
+            self._discard(self._by_task, public_id, subscriber)
+        subscriber.shown.clear()
+
+    def close(self) -> None:
+        """End every stream; clients reconnect, to another worker if this one is shutting down."""
+        for subscriber in self._subscribers:
+            subscriber.closed = True
+            with suppress(asyncio.QueueFull):
+                # wake the stream up; a full queue means it isn't waiting anyway
+                subscriber.queue.put_nowait("")
+        self._subscribers.clear()
+        self._followers.clear()
+        self._by_assignee.clear()
+        self._by_task.clear()
+
+    def publish(self, tasks: list[TaskRead]) -> None:
+        for task in tasks:
+            # each message is rendered once and shared by every subscriber it is sent to
+            message = f"data: {task.json()}\n\n"
+            owners = self._by_assignee.get(task.assignee.public_id, set())
+            previous_owners = self._by_task.get(task.public_id, set()) - owners
+            for subscriber in list(self._followers):
+                self._send(subscriber, message)
+            for subscriber in list(owners):
+                self._show(subscriber, task.public_id)
+                self._send(subscriber, message)
+            if previous_owners:
+                # only clients that show the task hear that it was reassigned away from them
+                removal = f"event: removed\ndata: {json.dumps({'public_id': str(task.public_id)})}\n\n"
+                for subscriber in previous_owners:
+                    subscriber.shown.discard(task.public_id)
+                    self._discard(self._by_task, task.public_id, subscriber)
+                    self._send(subscriber, removal)
+
+    def _show(self, subscriber: Subscriber, public_id: UUID) -> None:
+        subscriber.shown.add(public_id)
+        self._by_task.setdefault(public_id, set()).add(subscriber)
+
+    @staticmethod
+    def _discard(index: dict[UUID, set[Subscriber]], key: UUID, subscriber: Subscriber) -> None:
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del index[key]
+
+    def _send(self, subscriber: Subscriber, message: str) -> None:
+        if subscriber.evicted:
+            return
+        try:
+            subscriber.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # a client that can't keep up is dropped and told to reload instead of buffering without bound
+            subscriber.evicted = True
+            self.unsubscribe(subscriber)
+            FEED_EVICTIONS.inc()
+
+
+async def iter_task_feed(
+    task_feed: TaskFeed, assignee_id: UUID | None, shown: Iterable[UUID] = ()
+) -> AsyncIterator[str]:
+    # subscribe only once streaming starts, so the finally block always unsubscribes
+    subscriber = task_feed.subscribe(assignee_id, shown)
+    # not wait_for: it swallows a disconnect that cancels the stream just as a message arrives, leaving it subscribed
+    getter = None
+    try:
+        while not subscriber.evicted:
+            if getter is None:
+                getter = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=settings.TASK_FEED_HEARTBEAT_INTERVAL)
+            if done:
+                message, getter = getter.result(), None
+            else:
+                message = ": ping\n\n"
+            if subscriber.closed:
+                return
+            yield message
+        yield "event: reset\ndata: {}\n\n"
+    finally:
+        if getter is not None:
+            getter.cancel()
+        task_feed.unsubscribe(subscriber)
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from loguru import logger
+
+from app.db.models import Job, JobStatus
+from app.db.repositories import JobRepository
+
+# called by a job with the number of items it has just finished
+ReportProgress = Callable[[int], Awaitable[None]]
+
+
+class JobRegistry:
+    """Runs jobs in this worker and keeps their state in the database, so any worker can answer status polls.
+
+    Jobs of a worker that is killed stay ``running``; a worker shut down gracefully marks its jobs failed.
+    """
+
+    def __init__(self, job_repository: JobRepository) -> None:
+        self.job_repository = job_repository
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, work: Callable[[ReportProgress], Awaitable[None]]) -> Job:
+        job = await self.job_repository.create_job()
+        task = asyncio.create_task(self._run(job.id, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get(self, job_id: UUID) -> Job | None:
+        return await self.job_repository.get_job(job_id)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, job_id: UUID, work: Callable[[ReportProgress], Awaitable[None]]) -> None:
+        await self.job_repository.update_job(job_id, status=JobStatus.RUNNING)
+        try:
+            await work(lambda count: self.job_repository.add_processed(job_id, count))
+        except asyncio.CancelledError:
+            await self.job_repository.update_job(job_id, status=JobStatus.FAILED, error="Interrupted by shutdown")
+            raise
+        except Exception as exc:
+            logger.exception("Job {} failed", job_id)
+            await self.job_repository.update_job(job_id, status=JobStatus.FAILED, error=str(exc))
+        else:
+            await self.job_repository.update_job(job_id, status=JobStatus.DONE)
@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+import aiorun
+from aiokafka import AIOKafkaProducer
+from loguru import logger
+
+from app.db.models import OutboxMessage
+from app.db.repositories import OutboxRepository
+from app.db.session import Database
+from app.events.task import TaskAssigned, TaskCompleted, TaskCreated, TaskUpdated
+from app.publisher import relay_outbox, send_events
+from app.settings.config import settings
+from app.settings.logger import configure_logger
+
+EVENTS = {event.__name__: event for event in (TaskAssigned, TaskCompleted, TaskCreated, TaskUpdated)}
+
+
+async def main():
+    db = Database(
+        db_connect_url=settings.database_connection_url,
+        name="relay",
+        echo=settings.DEBUG,
+        **settings.database_pool_options,
+    )
+    outbox_repository = OutboxRepository(db)
+    producer = AIOKafkaProducer(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+        max_batch_size=settings.KAFKA_PRODUCER_MAX_BATCH_SIZE,
+    )
+    await producer.start()
+
+    async def publish(messages: list[OutboxMessage]) -> None:
+        await send_events(producer, ((EVENTS[msg.event_name].parse_raw(msg.payload), msg.topic) for msg in messages))
+
+    cleaned_at = 0.0
+
+    async def relay_batch() -> int:
+        nonlocal cleaned_at
+        if time.monotonic() - cleaned_at > settings.OUTBOX_CLEANUP_INTERVAL:
+            deleted = await outbox_repository.delete_sent(timedelta(seconds=settings.OUTBOX_RETENTION))
+            cleaned_at = time.monotonic()
+            if deleted:
+                logger.info("Deleted {} sent events", deleted)
+        started_at = time.perf_counter()
+        relayed = await outbox_repository.relay(publish, batch_size=settings.OUTBOX_BATCH_SIZE)
+        if relayed:
+            elapsed = time.perf_counter() - started_at
+            logger.info("Relayed {} events in {:.3f}s ({:.0f} events/sec)", relayed, elapsed, relayed / elapsed)
+        return relayed
+
+    try:
+        await relay_outbox(relay_batch)
+    finally:
+        await producer.stop()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    configure_logger(settings)
+    # a relay that gave up must exit: aiorun would otherwise log the error and keep an idle process running
+    aiorun.run(main(), use_uvloop=True, stop_on_unhandled_errors=True)
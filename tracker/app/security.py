@@ -1,3 +1,49 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
 from fastapi.security import OAuth2PasswordBearer
+from jose import jwt
+
+from app.cache import TTLCache
+from app.db.models import Role, User
+from app.settings.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+PRINCIPAL_CLAIMS = ("sub", "public_id", "role", "is_active", "ver", "iat")
+
+
+@dataclass(frozen=True)
+class Principal:
+    public_id: UUID
+    username: str
+    role: Role
+    is_active: bool
+
+    @classmethod
+    def from_claims(cls, payload: dict[str, Any]) -> "Principal":
+        return cls(
+            public_id=UUID(payload["public_id"]),
+            username=payload["sub"],
+            role=Role(payload["role"]),
+            is_active=payload["is_active"],
+        )
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(public_id=user.public_id, username=user.username, role=Role(user.role), is_active=user.is_active)
+
+
+def decode_access_token(token: str, token_cache: TTLCache[bytes, dict[str, Any]]) -> dict[str, Any]:
+    """Verify the token once and reuse its claims from cache until it expires."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        expires_in = payload["exp"] - time.time() if "exp" in payload else token_cache.ttl
+        if expires_in > 0:
+            token_cache.set(key, payload, ttl=expires_in)
+    return payload
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import signal
+import socket
+from types import FrameType
+
+import uvicorn
+from loguru import logger
+from uvicorn.supervisors import Multiprocess
+
+# also imported by the supervisor, so a broken app fails before workers are spawned
+from app.server import app
+from app.settings.config import settings
+
+
+class Server(uvicorn.Server):
+    """uvicorn server that drains within ``SERVER_DRAIN_TIMEOUT`` and always runs the app shutdown hooks."""
+
+    drain_expired = False
+
+    def handle_exit(self, sig: signal.Signals, frame: FrameType | None) -> None:
+        super().handle_exit(sig, frame)
+        app.state.ready = False
+        # feed streams never end on their own and would hold every open connection until the drain expires
+        task_feed = getattr(app.state, "task_feed", None)
+        if task_feed is not None:
+            task_feed.close()
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        timer = asyncio.get_running_loop().call_later(settings.SERVER_DRAIN_TIMEOUT, self.expire_drain)
+        try:
+            await super().shutdown(sockets=sockets)
+        finally:
+            timer.cancel()
+        if self.drain_expired:
+            # requests still in flight after the drain timeout are cut off, but the database pool is still closed
+            await self.lifespan.shutdown()
+
+    def expire_drain(self) -> None:
+        logger.warning("Connections did not drain in {}s, closing them", settings.SERVER_DRAIN_TIMEOUT)
+        self.drain_expired = True
+        self.force_exit = True
+
+
+class Supervisor(Multiprocess):
+    def shutdown(self) -> None:
+        # stop every worker before waiting for any, so they drain in parallel
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        logger.info("Stopped {} server workers", len(self.processes))
+
+
+def main() -> None:
+    config = uvicorn.Config(
+        "app.server:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=settings.SERVER_WORKERS or os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+    )
+    server = Server(config=config)
+    if config.workers > 1:
+        Supervisor(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
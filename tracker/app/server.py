@@ -1,20 +1,34 @@
 import asyncio
+import time
 
 import uvloop
-from aiokafka import AIOKafkaProducer
 from fastapi import FastAPI
 from loguru import logger
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
+from app import STARTED_AT
+from app.api.middlewares import MetricsMiddleware, UnitOfWorkMiddleware
 from app.api.routers import router
+from app.cache import TTLCache, UserCache, UserVersions
+from app.consumer import BackgroundConsumer, feed_task_changes, invalidate_user_cache
+from app.db.repositories import JobRepository, NoTaskAssignees, TaskRepository
 from app.db.session import Database
+from app.feed import TaskFeed
+from app.jobs import JobRegistry
+from app.metrics import Gauge
 from app.settings.config import AppSettings, settings
 from app.settings.logger import configure_logger
 
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
+STARTUP_DURATION = Gauge("app_startup_seconds", "Seconds from the first app import to each startup phase", ("phase",))
+
 
 class Application:
     def __init__(self, settings: AppSettings):
+        STARTUP_DURATION.set(time.perf_counter() - STARTED_AT, phase="import")
         configure_logger(settings)
 
         self.app = FastAPI(
@@ -23,6 +37,8 @@ class Application:
             debug=settings.DEBUG,
         )
         self.app.state.config = settings
+        self.app.state.ready = False
+        self.app.state.http_client = None
         self.add_middlewares(settings)
         self.configure_hooks()
         self.register_urls()
@@ -33,25 +49,44 @@ class Application:
 
     def configure_hooks(self) -> None:
         self.setup_exception_handlers()
-        self.app.add_event_handler("startup", self.create_databases_and_tables)
-        self.app.add_event_handler("startup", self.create_kafka_producer)
-
+        self.app.add_event_handler("startup", self.create_database_pool)
+        self.app.add_event_handler("startup", self.create_job_registry)
+        self.app.add_event_handler("startup", self.create_user_cache)
+        self.app.add_event_handler("startup", self.create_token_cache)
+        self.app.add_event_handler("startup", self.create_task_feed)
+        self.app.add_event_handler("startup", self.mark_ready)
+
+        self.app.add_event_handler("shutdown", self.close_task_feed)
+        self.app.add_event_handler("shutdown", self.close_http_client)
+        self.app.add_event_handler("shutdown", self.close_user_cache)
+        self.app.add_event_handler("shutdown", self.close_job_registry)
         self.app.add_event_handler("shutdown", self.close_database_pool)
-        self.app.add_event_handler("shutdown", self.close_kafka_producer)
 
     def register_urls(self) -> None:
         self.app.include_router(router)
 
     def setup_exception_handlers(self) -> None:
-        pass
+        self.app.add_exception_handler(NoTaskAssignees, self.no_task_assignees)
+
+    @staticmethod
+    async def no_task_assignees(request: Request, exc: NoTaskAssignees) -> JSONResponse:
+        return JSONResponse({"detail": str(exc)}, status_code=status.HTTP_409_CONFLICT)
 
     def add_middlewares(self, settings: AppSettings) -> None:
-        pass
+        self.app.add_middleware(UnitOfWorkMiddleware)
+        self.app.add_middleware(MetricsMiddleware)
+
+    async def mark_ready(self) -> None:
+        self.app.state.ready = True
+        STARTUP_DURATION.set(time.perf_counter() - STARTED_AT, phase="ready")
+        logger.info("Ready {:.2f}s after start", time.perf_counter() - STARTED_AT)
 
     async def create_database_pool(self) -> None:
         db = Database(
             db_connect_url=settings.database_connection_url,
+            name="server",
             echo=settings.DEBUG,
+            **settings.database_pool_options,
         )
         logger.info("Creating database connection")
         self.app.state.db = db
@@ -63,18 +98,45 @@ class Application:
         except Exception as exc:
             logger.warning("failed to close database pool due to {}", exc)
 
-    async def create_databases_and_tables(self) -> None:
-        await self.create_database_pool()
-        await self.app.state.db.create_tables()
+    async def create_job_registry(self) -> None:
+        self.app.state.jobs = JobRegistry(JobRepository(db=self.app.state.db))
+
+    async def close_job_registry(self) -> None:
+        await self.app.state.jobs.close()
+
+    async def create_user_cache(self) -> None:
+        user_cache = UserCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+        user_versions = UserVersions()
+        self.app.state.user_cache = user_cache
+        self.app.state.user_versions = user_versions
+        self.app.state.user_cache_invalidation = BackgroundConsumer(
+            "user_cache_invalidation",
+            lambda on_started: invalidate_user_cache(user_cache, user_versions, on_started),
+        )
+        self.app.state.user_cache_invalidation.start()
+
+    async def create_token_cache(self) -> None:
+        self.app.state.token_cache = TTLCache("token", maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+    async def close_http_client(self) -> None:
+        # created by the first request that needs it, see get_http_client
+        if self.app.state.http_client is not None:
+            await self.app.state.http_client.aclose()
+
+    async def create_task_feed(self) -> None:
+        task_feed = TaskFeed(buffer_size=settings.TASK_FEED_CLIENT_BUFFER_SIZE)
+        self.app.state.task_feed = task_feed
+        task_repository = TaskRepository(db=self.app.state.db)
+        self.app.state.task_feed_consumer = BackgroundConsumer(
+            "task_feed", lambda on_started: feed_task_changes(task_feed, task_repository, on_started)
+        )
+        self.app.state.task_feed_consumer.start()
 
-    async def create_kafka_producer(self) -> None:
-        producer = AIOKafkaProducer(bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS)
-        await producer.start()
-        self.app.state.producer = producer
+    async def close_task_feed(self) -> None:
+        await self.app.state.task_feed_consumer.stop()
 
-    async def close_kafka_producer(self) -> None:
-        producer = self.app.state.producer
-        await producer.stop()
+    async def close_user_cache(self) -> None:
+        await self.app.state.user_cache_invalidation.stop()
 
 
 app = Application(settings=settings).fastapi_app
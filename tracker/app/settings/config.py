@@ -1,5 +1,6 @@
 from enum import Enum
 from pathlib import Path
+from typing import Any
 
 from pydantic import BaseSettings
 
@@ -12,20 +13,44 @@ class LogLevelEnum(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+class EventCodecEnum(str, Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+    SCHEMA = "schema"
+
+
 class AppSettings(BaseSettings):
     LOG_LEVEL: LogLevelEnum = LogLevelEnum.DEBUG
     AIOKAFKA_LOG_LEVEL: LogLevelEnum = LogLevelEnum.INFO
 
     DEBUG: bool = False
 
+    APP_HOST: str = "0.0.0.0"
+    APP_PORT: int = 8080
+    SERVER_WORKERS: int | None = None  # defaults to the CPU count
+    SERVER_DRAIN_TIMEOUT: float = 30.0
+
     PG_USER: str
     PG_PASSWORD: str
     PG_HOST: str = "postgresql"
     PG_PORT: int = 5432
     PG_DB: str
 
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+
     OAUTH_TOKEN_URL: str
 
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_TIMEOUT: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 3.0
+
     SECRET_KEY: str
     ALGORITHM = "HS256"
 
@@ -34,10 +59,54 @@ class AppSettings(BaseSettings):
     KAFKA_TASK_STREAMING_TOPIC: str
     KAFKA_TASK_LIFECYCLE_TOPIC: str
     KAFKA_GROUP_ID: str
+    KAFKA_CONSUMER_BATCH_SIZE: int = 500
+    KAFKA_CONSUMER_BATCH_TIMEOUT_MS: int = 1_000
+    KAFKA_CONSUMER_WORKERS: int = 1
+    KAFKA_CONSUMER_LAG_REPORT_INTERVAL: float = 30.0
+    KAFKA_CONSUMER_METRICS_PORT: int | None = None  # worker N listens on port + N
+    KAFKA_PRODUCER_LINGER_MS: int = 10
+    KAFKA_PRODUCER_MAX_BATCH_SIZE: int = 256 * 1024
+    KAFKA_PUBLISH_BATCH_SIZE: int = 1_000
+    KAFKA_EVENT_CODEC: EventCodecEnum = EventCodecEnum.JSON
+    EVENT_SCHEMA_REGISTRY_PATH: Path = Path("schemas")
+
+    OUTBOX_BATCH_SIZE: int = 5_000
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    OUTBOX_RETENTION: float = 24 * 60 * 60  # seconds to keep sent messages for
+    OUTBOX_CLEANUP_INTERVAL: float = 60.0
+    OUTBOX_MAX_RETRIES: int = 10  # consecutive failed batches before the relay exits
+    OUTBOX_MAX_RETRY_BACKOFF: float = 30.0
+
+    TASK_SHUFFLE_BATCH_SIZE: int = 10_000
+    TASK_PAGE_SIZE: int = 100
+    TASK_PAGE_SIZE_MAX: int = 1_000
+    TASK_EXPORT_CHUNK_SIZE: int = 1_000
+    TASK_BULK_CREATE_MAX_SIZE: int = 1_000
+    TASK_FEED_CLIENT_BUFFER_SIZE: int = 1_000
+    TASK_FEED_HEARTBEAT_INTERVAL: float = 15.0
+    FAST_JSON_RESPONSES: bool = False  # serialize task pages with orjson, without validation
+
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 30.0
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL: float = 300.0  # used for tokens without exp claim
 
     @property
     def database_connection_url(self):
-        return f"postgresql+asyncpg://{self.PG_USER}:{self.PG_PASSWORD}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
+        return (
+            f"postgresql+asyncpg://{self.PG_USER}:{self.PG_PASSWORD}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
+            f"?prepared_statement_cache_size={self.DB_PREPARED_STATEMENT_CACHE_SIZE}"
+        )
+
+    @property
+    def database_pool_options(self) -> dict[str, Any]:
+        return {
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_POOL_MAX_OVERFLOW,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+        }
 
     class Config:
         env_file = f"app/settings/.env"
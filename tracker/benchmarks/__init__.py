@@ -0,0 +1,6 @@
+"""Benchmarks, run from the tracker directory as ``python -m benchmarks.<name>``.
+
+Database benchmarks use ``TEST_DATABASE_URL`` like the tests do, and truncate every table before seeding.
+"""
+# sets the environment the app settings are read from, so it has to run before any app module is imported
+from tests import conftest  # noqa: F401
@@ -0,0 +1,131 @@
+"""Measure encode/decode throughput and message size of each event codec.
+
+Events are stand-ins with the envelope and payload fields of ``TaskStream``, ``TaskAssignedData`` and ``UserStream``
+events, because the event schemas live in a separate package. Encoding goes through ``encode_event`` and decoding
+through ``decode_message``, the way the publishers and consumers call them; the schema registry is a temporary
+directory. msgpack has to be installed.
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+from uuid import UUID, uuid4
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+
+from app.codecs import (
+    CODECS,
+    JsonCodec,
+    MsgpackCodec,
+    SchemaCodec,
+    decode_message,
+    encode_event,
+    registry,
+)
+
+
+class Event(BaseModel):
+    event_id: UUID = Field(default_factory=uuid4)
+    event_version: int = 1
+    event_name: str
+    event_time: datetime = Field(default_factory=datetime.utcnow)
+    producer: str
+
+
+class TaskStream(BaseModel):
+    public_id: UUID
+    description: str
+    status: str
+    assignee_id: UUID
+
+
+class TaskAssignedData(BaseModel):
+    public_id: UUID
+    assignee_id: UUID
+
+
+class UserStream(BaseModel):
+    public_id: UUID
+    username: str
+    is_active: bool
+    role: str
+    version: int
+
+
+class TaskUpdated(Event):
+    data: TaskStream
+
+
+class TaskAssigned(Event):
+    data: TaskAssignedData
+
+
+class UserUpdated(Event):
+    data: UserStream
+
+
+EVENTS = {
+    "TaskStream": TaskUpdated(
+        event_name="task.updated",
+        producer="tracker",
+        data=TaskStream(
+            public_id=uuid4(),
+            description="[POPUG-1234] Fix the beak polisher",
+            status="IN_PROGRESS",
+            assignee_id=uuid4(),
+        ),
+    ),
+    "TaskAssignedData": TaskAssigned(
+        event_name="task.assigned", producer="tracker", data=TaskAssignedData(public_id=uuid4(), assignee_id=uuid4())
+    ),
+    "UserStream": UserUpdated(
+        event_name="user.updated",
+        producer="auth",
+        data=UserStream(public_id=uuid4(), username="popug-42", is_active=True, role="DEVELOPER", version=3),
+    ),
+}
+
+
+def rate(operation: Callable[[], Any], count: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(count):
+        operation()
+    return count / (time.perf_counter() - started_at)
+
+
+def main(count: int) -> None:
+    with tempfile.TemporaryDirectory() as registry_path:
+        # decode_message looks codecs up by content type, so the shared registry is the one to redirect
+        registry.root = Path(registry_path)
+        codecs = {
+            name: CODECS[codec.content_type]
+            for name, codec in [("json", JsonCodec), ("msgpack", MsgpackCodec), ("schema", SchemaCodec)]
+        }
+        print(
+            f"{'event':>16} {'codec':>8} {'value B':>7} {'headers B':>9} {'encode/s':>9} {'codec only':>10} "
+            f"{'decode/s':>9}"
+        )
+        for name, event in EVENTS.items():
+            record = jsonable_encoder(event)
+            for codec_name, codec in codecs.items():
+                value, headers = encode_event(event, codec)
+                assert decode_message(value, headers)["data"]["public_id"] == str(event.data.public_id)
+                headers_size = sum(len(key) + len(header) for key, header in headers)
+                encoded = rate(lambda: encode_event(event, codec), count)
+                # without turning the pydantic event into plain data, which encode_event does for every codec
+                codec_encoded = rate(lambda: codec.encode(record, type(event).__name__), count)
+                decoded = rate(lambda: decode_message(value, headers), count)
+                print(
+                    f"{name:>16} {codec_name:>8} {len(value):>7} {headers_size:>9} {encoded:>9.0f} "
+                    f"{codec_encoded:>10.0f} {decoded:>9.0f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", nargs="?", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.count)
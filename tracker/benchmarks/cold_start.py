@@ -0,0 +1,58 @@
+"""Time a cold start of one server worker, from spawning ``python -m app.serve`` to its first 200 response.
+
+Each run starts a fresh process with ``SERVER_WORKERS=1`` and polls ``/metrics`` until it answers, then reads the
+``app_startup_seconds`` phases the worker recorded. The server takes its settings from the environment like it does
+in the image, so postgres and kafka have to be reachable and migrated; this one doesn't use ``TEST_DATABASE_URL``.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+STARTUP_PHASE = re.compile(r'^app_startup_seconds\{phase="(\w+)"\} ([0-9.e+-]+)$', re.MULTILINE)
+
+
+def cold_start(port: int, timeout: float) -> tuple[float, dict[str, float]]:
+    """Seconds to the first 200 and the startup phases the worker reported."""
+    env = dict(os.environ, SERVER_WORKERS="1", APP_HOST="127.0.0.1", APP_PORT=str(port))
+    started_at = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "app.serve"], env=env)
+    try:
+        while time.perf_counter() - started_at < timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            except httpx.TransportError:
+                time.sleep(0.005)
+                continue
+            if response.status_code == 200:
+                elapsed = time.perf_counter() - started_at
+                return elapsed, {phase: float(value) for phase, value in STARTUP_PHASE.findall(response.text)}
+        raise SystemExit(f"no 200 from the server within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(runs: int, port: int, timeout: float) -> None:
+    results = [cold_start(port, timeout) for _ in range(runs)]
+    first_200 = [elapsed for elapsed, _ in results]
+    print(f"{runs} cold starts, median (min-max) seconds")
+    print(f"{'first 200':>10} {statistics.median(first_200):>6.3f} ({min(first_200):.3f}-{max(first_200):.3f})")
+    for phase in ("import", "ready"):
+        values = [phases[phase] for _, phases in results if phase in phases]
+        if values:
+            print(f"{phase:>10} {statistics.median(values):>6.3f} ({min(values):.3f}-{max(values):.3f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("runs", nargs="?", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8690)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    main(args.runs, args.port, args.timeout)
@@ -0,0 +1,21 @@
+from sqlalchemy import text
+
+from app.db.session import Base, Database
+from app.settings.config import settings
+from app.settings.logger import configure_logger
+from tests.conftest import TEST_DATABASE_URL, seed  # noqa: F401
+
+configure_logger(settings)
+
+
+def create_database() -> Database:
+    if not TEST_DATABASE_URL:
+        raise SystemExit("Set TEST_DATABASE_URL to a disposable postgres database")
+    return Database(db_connect_url=settings.database_connection_url, name="benchmark")
+
+
+async def reset(db: Database) -> None:
+    tables = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+    async with db.session() as session:
+        await session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        await session.commit()
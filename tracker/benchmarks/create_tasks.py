@@ -0,0 +1,79 @@
+"""Measure task creation throughput with one request at a time and with concurrent requests.
+
+``original`` reproduces the create_task this repository started with: an INSERT whose assignee is an
+``ORDER BY random() LIMIT 1`` subquery, a commit, then a re-fetch of the task with its assignee in a second session.
+``single`` is ``TaskRepository.create_task`` called once per task, the way ``POST /api/tasks`` does, and ``bulk`` is
+``TaskRepository.create_tasks`` called once per ``--batch-size`` tasks, the way ``POST /api/tasks/bulk`` does.
+With ``--outbox`` both write the created/assigned events of every task to the outbox as the endpoints do.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from app.api.schemas import TaskWrite
+from app.db.models import Task, User
+from app.db.repositories import CAN_BE_TASK_ASSIGNEE, TaskRepository
+from app.db.session import Database
+from benchmarks.common import create_database, reset, seed
+from benchmarks.outbox import iter_task_events
+
+
+async def create_task_original(db: Database, task_to_create: TaskWrite) -> Task:
+    async with db.session() as session:
+        random_assignee_id = (
+            select(User.public_id).where(User.role.in_(CAN_BE_TASK_ASSIGNEE)).order_by(func.random()).limit(1)
+        )
+        task = Task(assignee_id=random_assignee_id, **task_to_create.dict())
+        session.add(task)
+        await session.commit()
+    async with db.session() as session:
+        query = select(Task).filter_by(id=task.id).join(Task.assignee).options(selectinload(Task.assignee))
+        return (await session.execute(query)).scalar()
+
+
+async def create_tasks(create, count: int, concurrency: int, batch_size: int = 1) -> float:
+    """Create ``count`` tasks from ``concurrency`` workers, passing ``batch_size`` of them to each ``create``."""
+
+    async def worker(worker_count: int) -> None:
+        for batch_start in range(0, worker_count, batch_size):
+            batch = range(batch_start, min(batch_start + batch_size, worker_count))
+            await create([TaskWrite(description=f"task {number}") for number in batch])
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - started_at
+
+
+async def main(count: int, users: int, concurrency: list[int], batch_size: int, outbox: bool) -> None:
+    db = create_database()
+    repository = TaskRepository(db)
+    events = iter_task_events if outbox else None
+    await reset(db)
+    await seed(db, users=users, tasks=0)
+    creates = {
+        "original": (lambda tasks: create_task_original(db, *tasks), 1),
+        "single": (lambda tasks: repository.create_task(*tasks, events=events), 1),
+        "bulk": (lambda tasks: repository.create_tasks(tasks, events=events), batch_size),
+    }
+    if outbox:
+        del creates["original"]
+    print(f"{'engine':>8} {'batch':>6} {'concurrency':>11} {'tasks':>6} {'seconds':>8} {'tasks/s':>8}")
+    for requests in concurrency:
+        for name, (create, size) in creates.items():
+            elapsed = await create_tasks(create, count, requests, size)
+            print(f"{name:>8} {size:>6} {requests:>11} {count:>6} {elapsed:>8.2f} {count / elapsed:>8.0f}")
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", nargs="?", type=int, default=2_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--outbox", action="store_true", help="write task events to the outbox")
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.users, args.concurrency, args.batch_size, args.outbox))
@@ -0,0 +1,73 @@
+"""Compare peak RSS of the streaming task export with building the whole task list in memory.
+
+Each mode runs in a fresh process over the same seeded tasks:
+
+- ``export`` streams ``TaskReadRepository.stream_tasks`` chunks as NDJSON, the way ``/api/tasks/export`` does;
+- ``list`` loads every task with its assignee and encodes one JSON response, the way ``/api/tasks`` did before
+  pagination.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.api.schemas import TaskRead
+from app.db.models import Task
+from app.db.repositories import TaskReadRepository
+from app.settings.config import settings
+from benchmarks.common import create_database, reset, seed
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def export(db) -> int:
+    size = 0
+    async for chunk in TaskReadRepository(db).stream_tasks(chunk_size=settings.TASK_EXPORT_CHUNK_SIZE):
+        size += len("".join(TaskRead.from_orm(task).json() + "\n" for task in chunk))
+    return size
+
+
+async def list_all(db) -> int:
+    async with db.session() as session:
+        tasks = (await session.execute(select(Task).options(joinedload(Task.assignee)).order_by(Task.id))).scalars()
+        content = jsonable_encoder([TaskRead.from_orm(task) for task in tasks.all()])
+    return len(json.dumps(content))
+
+
+async def run(mode: str) -> None:
+    db = create_database()
+    started_at = time.perf_counter()
+    size = await {"export": export, "list": list_all}[mode](db)
+    elapsed = time.perf_counter() - started_at
+    print(f"{mode:>8} {size / 2**20:>9.1f} MiB {elapsed:>7.2f}s {peak_rss_mb():>9.1f} MiB peak RSS")
+    await db.disconnect()
+
+
+async def prepare(tasks: int) -> None:
+    db = create_database()
+    await reset(db)
+    await seed(db, users=1_000, tasks=tasks)
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("tasks", nargs="?", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=["export", "list"])
+    args = parser.parse_args()
+    if args.mode:
+        asyncio.run(run(args.mode))
+    else:
+        asyncio.run(prepare(args.tasks))
+        print(f"{'mode':>8} {'response':>13} {'seconds':>8} {'memory':>19}", flush=True)
+        for mode in ("export", "list"):
+            subprocess.run([sys.executable, "-m", "benchmarks.export", "--mode", mode], check=True)
@@ -0,0 +1,67 @@
+"""Measure what idle task feed subscribers cost and how long one task change takes to fan out to them.
+
+Every subscriber is an ``iter_task_feed`` stream waiting in its own task, the way a ``/api/tasks/feed`` response
+waits between messages. Memory is what tracemalloc sees allocated for the streams, so it leaves out the socket and
+HTTP protocol state the server keeps per connection. Half the subscribers follow all tasks and half only their own,
+spread over ``--assignees`` users.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from uuid import uuid4
+
+from app.api.schemas import TaskRead, UserRead
+from app.db.models import TaskStatus
+from app.feed import TaskFeed, iter_task_feed
+from app.settings.config import settings
+
+
+async def read_stream(task_feed: TaskFeed, assignee_id) -> None:
+    async for _ in iter_task_feed(task_feed, assignee_id):
+        pass
+
+
+async def main(subscribers: int, assignees: int, publishes: int) -> None:
+    assignee_ids = [uuid4() for _ in range(assignees)]
+    task_feed = TaskFeed(buffer_size=settings.TASK_FEED_CLIENT_BUFFER_SIZE)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    readers = [
+        asyncio.create_task(read_stream(task_feed, None if number % 2 else assignee_ids[number % assignees]))
+        for number in range(subscribers)
+    ]
+    while len(task_feed._subscribers) < subscribers:
+        await asyncio.sleep(0)
+    idle = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{subscribers} idle subscribers: {idle / 2**20:.1f} MiB, {idle / subscribers / 1024:.2f} KiB each")
+
+    elapsed = []
+    for number in range(publishes):
+        assignee = UserRead(public_id=assignee_ids[number % assignees], username="user", is_active=True, role="dev")
+        task = TaskRead(
+            id=number, public_id=uuid4(), description="task", status=TaskStatus.IN_PROGRESS, assignee=assignee
+        )
+        started_at = time.perf_counter()
+        task_feed.publish([task])
+        elapsed.append(time.perf_counter() - started_at)
+        # let every stream take its message, as they would between two consumer batches
+        await asyncio.sleep(0)
+    elapsed.sort()
+    print(f"publish one task: {elapsed[len(elapsed) // 2] * 1000:.2f} ms median, {elapsed[-1] * 1000:.2f} ms max")
+
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    print(f"subscribers left after every client disconnected: {len(task_feed._subscribers)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("subscribers", nargs="?", type=int, default=10_000)
+    parser.add_argument("--assignees", type=int, default=100)
+    parser.add_argument("--publishes", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.assignees, args.publishes))
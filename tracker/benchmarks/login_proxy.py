@@ -0,0 +1,110 @@
+"""Measure the latency the token proxy adds in front of the auth service, under concurrency.
+
+A stub auth service answering ``POST /token`` with a fixed token runs in a subprocess. Each login sends the form the
+way ``/api/token`` does, either through a new ``httpx.AsyncClient`` per login, as the proxy did before, or through the
+pooled keep-alive client from ``create_http_client``, streaming the answer back the way the proxy does now.
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.api.deps import create_http_client
+
+TOKEN = {"access_token": "x" * 300, "token_type": "bearer"}
+
+
+async def issue_token(request) -> JSONResponse:
+    await request.form()
+    return JSONResponse(TOKEN)
+
+
+def serve_stub(port: int) -> None:
+    app = Starlette(routes=[Route("/token", issue_token, methods=["POST"])])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def login_with_new_client(url: str) -> bytes:
+    async with httpx.AsyncClient() as http_client:
+        response = await http_client.post(url, data={"username": "developer", "password": "password"})
+        return response.content
+
+
+def login_with(http_client: httpx.AsyncClient):
+    async def login(url: str) -> bytes:
+        request = http_client.build_request("POST", url, data={"username": "developer", "password": "password"})
+        response = await http_client.send(request, stream=True)
+        try:
+            return b"".join([chunk async for chunk in response.aiter_bytes()])
+        finally:
+            await response.aclose()
+
+    return login
+
+
+async def run_logins(login, url: str, count: int, concurrency: int) -> tuple[float, list[float]]:
+    latencies = []
+
+    async def worker(worker_count: int) -> None:
+        for _ in range(worker_count):
+            started_at = time.perf_counter()
+            await login(url)
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - started_at, latencies
+
+
+async def wait_for(url: str) -> None:
+    async with httpx.AsyncClient() as http_client:
+        for _ in range(100):
+            try:
+                await http_client.post(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise SystemExit(f"The stub auth service did not start at {url}")
+
+
+async def main(count: int, concurrency: list[int], port: int) -> None:
+    url = f"http://127.0.0.1:{port}/token"
+    await wait_for(url)
+    pooled_client = create_http_client()
+    logins = {"new client": login_with_new_client, "pooled": login_with(pooled_client)}
+    print(f"{'client':>10} {'concurrency':>11} {'logins/s':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    for requests in concurrency:
+        for name, login in logins.items():
+            await login(url)
+            elapsed, latencies = await run_logins(login, url, count, requests)
+            p50, p99 = (quantile * 1000 for quantile in statistics.quantiles(latencies, n=100)[49::49])
+            print(f"{name:>10} {requests:>11} {len(latencies) / elapsed:>8.0f} {p50:>7.2f} {p99:>7.2f}")
+    await pooled_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", nargs="?", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve-stub", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_stub:
+        serve_stub(args.port)
+    else:
+        stub = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.login_proxy", "--serve-stub", "--port", str(args.port)]
+        )
+        try:
+            asyncio.run(main(args.count, args.concurrency, args.port))
+        finally:
+            stub.terminate()
+            stub.wait()
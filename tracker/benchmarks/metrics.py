@@ -0,0 +1,125 @@
+"""Measure what the /metrics instrumentation costs per request.
+
+Two numbers are measured separately, because on a shared machine the run-to-run noise of whole requests is larger
+than the overhead itself:
+
+- the instrumentation in isolation: ``MetricsMiddleware`` around an ASGI app that only starts a response, and
+  ``SELECT 1`` with and without the statement timer listeners, over many iterations;
+- whole requests of the ``benchmarks.unit_of_work`` routes, instrumented and not, in interleaved rounds.
+
+The relative overhead is the isolated cost times its occurrences per request over the request time.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import event, text
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.api.middlewares import MetricsMiddleware
+from app.db.session import Database, start_statement_timer, stop_statement_timer
+from app.metrics import REGISTRY
+from benchmarks.common import create_database, reset, seed
+from benchmarks.unit_of_work import create_app
+
+
+def set_statement_timers(db: Database, enabled: bool) -> None:
+    engine = db._engine.sync_engine
+    for name, listener in [
+        ("before_cursor_execute", start_statement_timer),
+        ("after_cursor_execute", stop_statement_timer),
+    ]:
+        if event.contains(engine, name, listener) != enabled:
+            (event.listen if enabled else event.remove)(engine, name, listener)
+
+
+async def time_requests(app, method: str, url: str, count: int) -> float:
+    """Seconds per request."""
+    async with httpx.AsyncClient(app=app, base_url="http://tracker") as client:
+        started_at = time.perf_counter()
+        for _ in range(count):
+            (await client.request(method, url)).raise_for_status()
+        return (time.perf_counter() - started_at) / count
+
+
+async def time_calls(call, count: int) -> float:
+    """Seconds per awaited ``call()``."""
+    started_at = time.perf_counter()
+    for _ in range(count):
+        await call()
+    return (time.perf_counter() - started_at) / count
+
+
+async def time_middleware(count: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/", "route": Route("/", Response)}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message) -> None:
+        pass
+
+    async def app(scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    middleware = MetricsMiddleware(app)
+    return await time_calls(lambda: middleware(scope, receive, send), count) - await time_calls(
+        lambda: app(scope, receive, send), count
+    )
+
+
+async def time_statement_timers(db: Database, count: int, rounds: int) -> float:
+    """Extra seconds per ``SELECT 1`` with the timer listeners attached, which also puts the engine on its event path."""
+    times = {True: [], False: []}
+    async with db.session() as session:
+        for number in range(rounds):
+            for timed in (True, False) if number % 2 else (False, True):
+                set_statement_timers(db, timed)
+                times[timed].append(await time_calls(lambda: session.execute(text("SELECT 1")), count))
+    return min(times[True]) - min(times[False])
+
+
+async def main(count: int, rounds: int) -> None:
+    db = create_database()
+    await reset(db)
+    await seed(db, users=100, tasks=10_000)
+
+    middleware_cost = min([await time_middleware(count) for _ in range(rounds)])
+    timer_cost = await time_statement_timers(db, count // 10, rounds)
+    print(f"MetricsMiddleware: {middleware_cost * 1e6:.1f} us per request")
+    print(f"statement timers: {timer_cost * 1e6:.1f} us per statement")
+
+    print(f"{'request':>17} {'statements':>10} {'plain ms':>8} {'metrics ms':>10} {'measured':>8} {'estimated':>9}")
+    for method, url, statements in [("POST", "/api/tasks", 3), ("GET", "/api/tasks/my", 2)]:
+        plain_app, instrumented_app = create_app(db, unit_of_work=True), create_app(db, unit_of_work=True)
+        instrumented_app.add_middleware(MetricsMiddleware)
+        plain, instrumented = [], []
+        runs = [(plain_app, False, plain), (instrumented_app, True, instrumented)]
+        for number in range(rounds):
+            # alternating which one goes first cancels out drift, such as the task table growing
+            for app, timed, times in runs if number % 2 else runs[::-1]:
+                set_statement_timers(db, timed)
+                times.append(await time_requests(app, method, url, count // 10))
+        plain_time, instrumented_time = statistics.median(plain), statistics.median(instrumented)
+        measured = instrumented_time / plain_time - 1
+        estimated = (middleware_cost + statements * timer_cost) / plain_time
+        print(
+            f"{method + ' ' + url:>17} {statements:>10} {plain_time * 1000:>8.2f} {instrumented_time * 1000:>10.2f} "
+            f"{measured:>8.1%} {estimated:>9.2%}"
+        )
+
+    started_at = time.perf_counter()
+    body = REGISTRY.render()
+    print(f"/metrics render: {(time.perf_counter() - started_at) * 1000:.2f} ms for {len(body.splitlines())} lines")
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", nargs="?", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.rounds))
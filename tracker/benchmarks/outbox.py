@@ -0,0 +1,69 @@
+"""Time the database side of the outbox: shuffle writing events, relaying them and deleting them once sent.
+
+Publishing is a no-op, so Kafka is not part of the numbers. Events are stand-ins of the same size as the task
+events, because the event schemas live in a separate package.
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.db.models import OutboxMessage, Task
+from app.db.repositories import OutboxRepository, TaskRepository
+from benchmarks.common import create_database, reset, seed
+
+
+class TaskEvent(BaseModel):
+    public_id: UUID
+    description: str
+    status: str
+    assignee_id: UUID
+
+
+def iter_task_events(task: Task):
+    event = TaskEvent(
+        public_id=task.public_id, description=task.description, status=task.status, assignee_id=task.assignee_id
+    )
+    yield event, "task-streaming"
+    yield event, "task-lifecycle"
+
+
+async def publish(messages: list[OutboxMessage]) -> None:
+    pass
+
+
+async def main(tasks: int, batch_size: int) -> None:
+    db = create_database()
+    task_repository, outbox_repository = TaskRepository(db), OutboxRepository(db)
+    await reset(db)
+    await seed(db, users=1_000, tasks=tasks)
+
+    for name, events in [("shuffle", None), ("shuffle + outbox", iter_task_events)]:
+        started_at = time.perf_counter()
+        async for _ in task_repository.iter_shuffled_tasks(events=events):
+            pass
+        elapsed = time.perf_counter() - started_at
+        print(f"{name:>18} {tasks:>9} tasks {elapsed:>7.2f}s {tasks / elapsed:>9.0f}/s")
+
+    messages, started_at = 0, time.perf_counter()
+    while relayed := await outbox_repository.relay(publish, batch_size=batch_size):
+        messages += relayed
+    elapsed = time.perf_counter() - started_at
+    print(f"{'relay':>18} {messages:>9} events {elapsed:>6.2f}s {messages / elapsed:>9.0f}/s")
+
+    started_at = time.perf_counter()
+    deleted = await outbox_repository.delete_sent(timedelta(0))
+    elapsed = time.perf_counter() - started_at
+    print(f"{'delete sent':>18} {deleted:>9} events {elapsed:>6.2f}s {deleted / elapsed:>9.0f}/s")
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("tasks", nargs="?", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.batch_size))
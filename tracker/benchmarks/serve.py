@@ -0,0 +1,105 @@
+"""Compare request throughput of the serve modes over real sockets.
+
+The server is the ``benchmarks.unit_of_work`` app behind ``UnitOfWorkMiddleware``, run by uvicorn in a subprocess
+either as ``serve-dev`` runs the tracker (one worker under ``--reload``) or as ``serve`` does (``--workers`` processes
+on uvloop and httptools). ``--clients`` load processes each keep ``--concurrency`` requests to
+``GET /api/tasks/my`` in flight for ``--duration`` seconds. Workers only add throughput when the machine has a CPU
+for each of them besides the clients and postgres.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from starlette.applications import Starlette
+
+from benchmarks.common import create_database, reset, seed
+from benchmarks.unit_of_work import create_app
+
+URL = "/api/tasks/my"
+
+
+def create_server_app() -> Starlette:
+    return create_app(create_database(), unit_of_work=True)
+
+
+def start_server(port: int, workers: int | None) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "--factory", "benchmarks.serve:create_server_app"]
+    command += ["--port", str(port), "--log-level", "warning"]
+    if workers is None:
+        command += ["--reload", "--reload-dir", "benchmarks"]
+    else:
+        command += ["--workers", str(workers), "--loop", "uvloop", "--http", "httptools"]
+    server = subprocess.Popen(command)
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}{URL}").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit(f"server on port {port} did not start")
+
+
+async def load(base_url: str, concurrency: int, duration: float) -> list[float]:
+    latencies = []
+    stop_at = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+
+        async def worker() -> None:
+            while time.perf_counter() < stop_at:
+                started_at = time.perf_counter()
+                (await client.get(URL)).raise_for_status()
+                latencies.append(time.perf_counter() - started_at)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def run_client(base_url: str, concurrency: int, duration: float) -> list[float]:
+    return asyncio.run(load(base_url, concurrency, duration))
+
+
+async def prepare() -> None:
+    db = create_database()
+    await reset(db)
+    await seed(db, users=100, tasks=10_000)
+    await db.disconnect()
+
+
+def main(workers: list[int], clients: int, concurrency: int, duration: float) -> None:
+    asyncio.run(prepare())
+    print(f"{os.cpu_count()} CPUs, {clients} clients x {concurrency} requests in flight, {duration:.0f}s per mode")
+    print(f"{'mode':>12} {'requests':>9} {'req/s':>7} {'p50 ms':>7} {'p99 ms':>7}")
+    context = multiprocessing.get_context("spawn")
+    for port, mode_workers in enumerate([None, *workers], start=8600):
+        server = start_server(port, mode_workers)
+        try:
+            with context.Pool(clients) as pool:
+                arguments = [(f"http://127.0.0.1:{port}", concurrency, duration)] * clients
+                latencies = sorted(latency for result in pool.starmap(run_client, arguments) for latency in result)
+        finally:
+            server.terminate()
+            server.wait()
+        mode = "reload" if mode_workers is None else f"workers={mode_workers}"
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(
+            f"{mode:>12} {len(latencies):>9} {len(latencies) / duration:>7.0f} "
+            f"{statistics.median(latencies) * 1000:>7.1f} {p99 * 1000:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+    main(sorted(set(args.workers)), args.clients, args.concurrency, args.duration)
@@ -0,0 +1,70 @@
+"""Time a full shuffle of 10k/100k/1M open tasks over 1000 assignees.
+
+``--baseline`` also times the original single UPDATE with a correlated ``ORDER BY random() LIMIT 1`` per row.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import DBAPIError
+
+from app.db.models import Task, TaskStatus, User
+from app.db.repositories import CAN_BE_TASK_ASSIGNEE, TaskRepository
+from app.db.session import Database
+from benchmarks.common import create_database, reset, seed
+
+
+async def shuffle_baseline(db: Database) -> int:
+    random_assignee_id = (
+        select(User.public_id)
+        .where(Task.id > 0, User.role.in_(CAN_BE_TASK_ASSIGNEE))
+        .order_by(func.random())
+        .limit(1)
+        .scalar_subquery()
+    )
+    async with db.session() as session:
+        updated = await session.execute(
+            update(Task).where(Task.status != TaskStatus.DONE).values(assignee_id=random_assignee_id).returning(Task.id)
+        )
+        task_ids = updated.scalars().all()
+        tasks = await session.execute(select(Task).where(Task.id.in_(task_ids)))
+        count = len(tasks.scalars().all())
+        await session.commit()
+    return count
+
+
+async def shuffle(repository: TaskRepository) -> int:
+    return sum([len(tasks) async for tasks in repository.iter_shuffled_tasks()])
+
+
+async def main(sizes: list[int], users: int, baseline: bool) -> None:
+    db = create_database()
+    repository = TaskRepository(db)
+    print(f"{'open tasks':>10} {'engine':>8} {'seconds':>8} {'tasks/s':>9}")
+    for size in sizes:
+        await reset(db)
+        await seed(db, users=users, tasks=size)
+        runs = [("batched", lambda: shuffle(repository))]
+        if baseline:
+            runs.append(("baseline", lambda: shuffle_baseline(db)))
+        for name, run in runs:
+            started_at = time.perf_counter()
+            try:
+                shuffled = await run()
+            except DBAPIError as exc:
+                print(f"{size:>10} {name:>8} failed: {exc.orig}")
+                continue
+            elapsed = time.perf_counter() - started_at
+            assert shuffled == size
+            print(f"{size:>10} {name:>8} {elapsed:>8.2f} {size / elapsed:>9.0f}")
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sizes", nargs="*", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--baseline", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.users, args.baseline))
@@ -0,0 +1,55 @@
+"""Time the authentication dependencies for a token presented again and again, with and without the token cache.
+
+The token carries the principal claims, so neither run touches the database.
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from jose import jwt
+
+from app.api.deps import get_current_active_user, get_current_user
+from app.cache import TTLCache, UserCache, UserVersions
+from app.db.models import Role
+from app.settings.config import settings
+
+
+def create_token(user_versions: UserVersions) -> str:
+    claims = {
+        "sub": "developer",
+        "public_id": str(uuid4()),
+        "role": Role.DEVELOPER.value,
+        "is_active": True,
+        "ver": 1,
+        "iat": user_versions.started_at + 1,
+        "exp": time.time() + 3600,
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+async def authenticate(token: str, requests: int, user_versions: UserVersions, token_cache: TTLCache) -> float:
+    user_cache = UserCache(maxsize=1, ttl=1)
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        principal = await get_current_user(token, None, user_cache, user_versions, token_cache)
+        await get_current_active_user(principal)
+    return time.perf_counter() - started_at
+
+
+async def main(requests: int) -> None:
+    user_versions = UserVersions()
+    token = create_token(user_versions)
+    for name, token_cache in [
+        ("no cache", TTLCache("token", maxsize=0, ttl=settings.TOKEN_CACHE_TTL)),
+        ("cache", TTLCache("token", maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)),
+    ]:
+        elapsed = await authenticate(token, requests, user_versions, token_cache)
+        print(f"{name:>8} {requests:>7} requests {elapsed:>6.2f}s {elapsed / requests * 1e6:>7.1f}us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("requests", nargs="?", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,106 @@
+"""Count connection checkouts and transactions per HTTP request with and without the per-request unit of work.
+
+The routes make the repository calls of their API counterparts, ``get_current_user`` resolving the user from the
+database as it does when the token claims can't be trusted: ``POST /api/tasks`` looks the user up and creates a task
+with its outbox events, ``GET /api/tasks/my`` looks the user up and reads the first page of their tasks. Requests go
+through ``UnitOfWorkMiddleware`` or straight to the route, over ASGI without a network.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.api.middlewares import UnitOfWorkMiddleware
+from app.api.schemas import TaskWrite
+from app.db.repositories import TaskReadRepository, TaskRepository, UserRepository
+from app.db.session import Database
+from benchmarks.common import create_database, reset, seed
+from benchmarks.outbox import iter_task_events
+
+
+class Counts:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.transactions = 0
+
+    def count_checkout(self, *args) -> None:
+        self.checkouts += 1
+
+    def count_transaction(self, *args) -> None:
+        self.transactions += 1
+
+
+def create_app(db: Database, unit_of_work: bool) -> Starlette:
+    async def create_task(request: Request) -> JSONResponse:
+        user = await UserRepository(db).get_user_by_username("user-1")
+        task = await TaskRepository(db).create_task(TaskWrite(description="benchmark"), events=iter_task_events)
+        return JSONResponse({"id": task.id, "created_by": user.username})
+
+    async def read_my_tasks(request: Request) -> JSONResponse:
+        user = await UserRepository(db).get_user_by_username("user-1")
+        tasks = await TaskReadRepository(db).get_tasks(50, assignee_id=user.public_id)
+        return JSONResponse({"tasks": len(tasks)})
+
+    app = Starlette(
+        routes=[
+            Route("/api/tasks", create_task, methods=["POST"]),
+            Route("/api/tasks/my", read_my_tasks, methods=["GET"]),
+        ],
+        middleware=[Middleware(UnitOfWorkMiddleware)] if unit_of_work else [],
+    )
+    app.state.db = db
+    return app
+
+
+async def run_requests(app: Starlette, method: str, url: str, count: int, concurrency: int) -> float:
+    async with httpx.AsyncClient(app=app, base_url="http://tracker") as client:
+
+        async def worker(worker_count: int) -> None:
+            for _ in range(worker_count):
+                response = await client.request(method, url)
+                response.raise_for_status()
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+        return time.perf_counter() - started_at
+
+
+async def main(count: int, concurrency: list[int]) -> None:
+    db = create_database()
+    await reset(db)
+    await seed(db, users=100, tasks=10_000)
+    counts = Counts()
+    event.listen(Pool, "checkout", counts.count_checkout)
+    event.listen(Session, "after_begin", counts.count_transaction)
+
+    print(
+        f"{'request':>17} {'unit of work':>12} {'concurrency':>11} {'checkouts':>9} {'transactions':>12} {'req/s':>6}"
+    )
+    for method, url in [("POST", "/api/tasks"), ("GET", "/api/tasks/my")]:
+        for requests in concurrency:
+            for unit_of_work in (False, True):
+                app = create_app(db, unit_of_work)
+                counts.checkouts = counts.transactions = 0
+                elapsed = await run_requests(app, method, url, count, requests)
+                print(
+                    f"{method + ' ' + url:>17} {'yes' if unit_of_work else 'no':>12} {requests:>11} "
+                    f"{counts.checkouts / count:>9.2f} {counts.transactions / count:>12.2f} {count / elapsed:>6.0f}"
+                )
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", nargs="?", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.concurrency))
@@ -0,0 +1,73 @@
+"""Replay user CUD events through the consumer's batch path and time it.
+
+Events are JSON messages as the user stream carries them: ``users`` users with ``versions`` ``user.created`` /
+``user.updated`` events each, spread over partitions in version order per user the way keying by public_id does.
+Batches of ``KAFKA_CONSUMER_BATCH_SIZE`` messages go through ``upsert_user_states``, which decodes them and applies
+one versioned upsert per batch. The same events are then replayed, which rewrites nothing, and replayed again in
+reverse order, where every batch carries older versions than the stored ones.
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy import func, select
+
+from app.consumer import upsert_user_states
+from app.db.models import User
+from app.db.repositories import UserRepository
+from app.settings.config import settings
+from benchmarks.common import create_database, reset
+
+ROLES = ("DEVELOPER", "ACCOUNTANT", "MANAGER")
+
+
+def create_messages(users: int, versions: int) -> list[SimpleNamespace]:
+    messages = []
+    public_ids = [uuid4() for _ in range(users)]
+    for version in range(versions):
+        event_name = b"user.created" if version == 0 else b"user.updated"
+        for number, public_id in enumerate(public_ids):
+            data = {
+                "public_id": str(public_id),
+                "username": f"user-{number}",
+                "is_active": version % 5 != 4,
+                "role": ROLES[(number + version) % len(ROLES)],
+                "version": version,
+            }
+            value = json.dumps({"event_name": event_name.decode(), "data": data}).encode()
+            messages.append(SimpleNamespace(value=value, headers=[("event_name", event_name)]))
+    return messages
+
+
+async def replay(repository: UserRepository, messages: list[SimpleNamespace], batch_size: int) -> float:
+    started_at = time.perf_counter()
+    for batch_start in range(0, len(messages), batch_size):
+        await upsert_user_states(repository, messages[batch_start : batch_start + batch_size])
+    return time.perf_counter() - started_at
+
+
+async def main(events: int, versions: int, batch_size: int) -> None:
+    db = create_database()
+    repository = UserRepository(db)
+    await reset(db)
+    messages = create_messages(events // versions, versions)
+    for name, ordered in [("first", messages), ("replay", messages), ("reversed", messages[::-1])]:
+        elapsed = await replay(repository, ordered, batch_size)
+        print(f"{name:>8} {len(ordered):>9} events {elapsed:>7.2f}s {len(ordered) / elapsed:>9.0f}/s", flush=True)
+
+    async with db.session() as session:
+        latest = select(func.count()).where(User.version == versions - 1)
+        assert await session.scalar(latest) == events // versions
+    await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("events", nargs="?", type=int, default=1_000_000)
+    parser.add_argument("--versions", type=int, default=5, help="events per user")
+    parser.add_argument("--batch-size", type=int, default=settings.KAFKA_CONSUMER_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.versions, args.batch_size))
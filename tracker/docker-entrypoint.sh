@@ -7,6 +7,13 @@ serve() {
   wait_for_postgresql
   wait_for_kafka
 
+  exec python -m app.serve
+}
+
+serve_dev() {
+  wait_for_postgresql
+  wait_for_kafka
+
   export HOST=${APP_HOST:-0.0.0.0}
   export PORT=${APP_PORT:-8080}
   exec python -m uvicorn app.server:app --host "${HOST}" --port "${PORT}" --reload
@@ -22,6 +29,19 @@ consume() {
   exec python -m app.consumer
 }
 
+migrate() {
+  wait_for_postgresql
+
+  exec python -m alembic -c app/db/alembic.ini upgrade head
+}
+
+relay() {
+  wait_for_postgresql
+  wait_for_kafka
+
+  exec python -m app.relay
+}
+
 wait_for_kafka() {
   until kafkacat -b "${KAFKA_BOOTSTRAP_SERVERS:-kafka:29092}" -L  > /dev/null 2>&1
   do
@@ -44,7 +64,9 @@ help() {
   echo "Usage:"
   echo ""
   echo "help -- show this help"
-  echo "serve -- start auth backend with hot-reloading"
+  echo "serve -- start tracker backend with SERVER_WORKERS workers"
+  echo "serve-dev -- start tracker backend with hot-reloading"
+  echo "migrate -- apply database migrations"
   echo ""
 }
 
@@ -57,10 +79,22 @@ case "$1" in
     shift
     serve
     ;;
+  serve-dev)
+    shift
+    serve_dev
+    ;;
   consume)
     shift
     consume
     ;;
+  relay)
+    shift
+    relay
+    ;;
+  migrate)
+    shift
+    migrate
+    ;;
   *)
     exec "$@"
     ;;
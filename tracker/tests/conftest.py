@@ -0,0 +1,124 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.engine import make_url
+
+# database tests need a disposable postgres: its schema is dropped and migrated from scratch on every run
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    url = make_url(TEST_DATABASE_URL)
+    os.environ.update(
+        PG_USER=url.username or "",
+        PG_PASSWORD=url.password or "",
+        PG_HOST=url.host or "localhost",
+        PG_PORT=str(url.port or 5432),
+        PG_DB=url.database,
+    )
+
+# settings are read when app modules are first imported
+for name, value in {
+    "PG_USER": "tracker",
+    "PG_PASSWORD": "tracker",
+    "PG_DB": "tracker",
+    "OAUTH_TOKEN_URL": "http://auth/api/token",
+    "SECRET_KEY": "secret",
+    "KAFKA_USER_STREAMING_TOPIC": "user-streaming",
+    "KAFKA_TASK_STREAMING_TOPIC": "task-streaming",
+    "KAFKA_TASK_LIFECYCLE_TOPIC": "task-lifecycle",
+    "KAFKA_GROUP_ID": "tracker",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(name, value)
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.db.models import Role, Task, TaskStatus, User  # noqa: E402
+from app.db.session import Base, Database  # noqa: E402
+from app.settings.config import settings  # noqa: E402
+
+ALEMBIC_CONFIG = Path(__file__).parents[1] / "app" / "db" / "alembic.ini"
+
+AddUsers = Callable[..., Awaitable[list[User]]]
+AddTasks = Callable[..., Awaitable[list[Task]]]
+
+
+async def execute(*statements: str) -> None:
+    engine = create_async_engine(settings.database_connection_url)
+    async with engine.begin() as connection:
+        for statement in statements:
+            await connection.execute(text(statement))
+    await engine.dispose()
+
+
+async def seed(db: Database, users: int, tasks: int, done_ratio: float = 0.0) -> None:
+    """Insert ``users`` developers and ``tasks`` tasks spread over them, ``done_ratio`` of them done."""
+    async with db.session() as session:
+        await session.execute(
+            text(
+                'INSERT INTO "user" (public_id, username, is_active, role) '
+                "SELECT gen_random_uuid(), 'user-' || n, true, 'DEVELOPER' FROM generate_series(1, :users) n"
+            ),
+            {"users": users},
+        )
+        await session.execute(
+            text(
+                "INSERT INTO task (public_id, description, status, assignee_id, created_at, updated_at) "
+                "SELECT gen_random_uuid(), 'task ' || n, "
+                "CASE WHEN random() < :done_ratio THEN 'DONE' ELSE 'IN_PROGRESS' END::taskstatus, "
+                "assignees.ids[1 + n % cardinality(assignees.ids)], now(), now() "
+                'FROM generate_series(1, :tasks) n, (SELECT array_agg(public_id) AS ids FROM "user") assignees'
+            ),
+            {"tasks": tasks, "done_ratio": done_ratio},
+        )
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+
+@pytest.fixture(scope="session")
+def database_schema() -> None:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    asyncio.run(execute("DROP SCHEMA public CASCADE", "CREATE SCHEMA public"))
+    command.upgrade(Config(str(ALEMBIC_CONFIG)), "head")
+
+
+@pytest.fixture
+async def db(database_schema: None) -> AsyncIterator[Database]:
+    tables = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+    await execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+    db = Database(db_connect_url=settings.database_connection_url, name="test")
+    yield db
+    await db.disconnect()
+
+
+@pytest.fixture
+def add_users(db: Database) -> AddUsers:
+    async def add_users(*roles: Role) -> list[User]:
+        users = [User(public_id=uuid4(), username=f"{role.value}-{uuid4()}", role=role) for role in roles]
+        async with db.session() as session:
+            session.add_all(users)
+            await session.commit()
+        return users
+
+    return add_users
+
+
+@pytest.fixture
+def add_tasks(db: Database) -> AddTasks:
+    async def add_tasks(assignee: User, count: int, status: TaskStatus = TaskStatus.IN_PROGRESS) -> list[Task]:
+        tasks = [
+            Task(description=f"task {number}", status=status, assignee_id=assignee.public_id) for number in range(count)
+        ]
+        async with db.session() as session:
+            session.add_all(tasks)
+            await session.commit()
+        return tasks
+
+    return add_tasks
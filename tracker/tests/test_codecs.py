@@ -0,0 +1,43 @@
+import pytest
+
+from app import codecs
+from app.codecs import (
+    CODECS,
+    JsonCodec,
+    MsgpackCodec,
+    SchemaCodec,
+    SchemaRegistry,
+    decode_message,
+    encode_event,
+)
+
+RECORD = {"event_name": "task.updated", "event_version": 1, "data": {"public_id": "1", "status": "DONE"}}
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch) -> SchemaRegistry:
+    monkeypatch.setattr(codecs.registry, "root", tmp_path)
+    return codecs.registry
+
+
+@pytest.mark.parametrize("codec_class", [JsonCodec, MsgpackCodec, SchemaCodec])
+def test_events_decode_to_what_was_encoded(codec_class):
+    value, headers = encode_event(RECORD, CODECS[codec_class.content_type])
+
+    assert decode_message(value, headers) == RECORD
+    assert ("event_name", b"task.updated") in headers
+
+
+def test_messages_without_content_type_are_json():
+    value, _ = encode_event(RECORD, CODECS[JsonCodec.content_type])
+
+    assert decode_message(value, []) == RECORD
+
+
+def test_registry_adds_a_version_when_the_layout_changes(tmp_path):
+    changed = {**RECORD, "data": {**RECORD["data"], "assignee_id": "2"}}
+
+    assert SchemaRegistry(tmp_path).resolve("TaskUpdated", RECORD)[0] == 1
+    assert SchemaRegistry(tmp_path).resolve("TaskUpdated", changed)[0] == 2
+    # another process finds the registered versions instead of adding new ones
+    assert SchemaRegistry(tmp_path).resolve("TaskUpdated", RECORD)[0] == 1
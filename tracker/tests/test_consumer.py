@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app import consumer as consumer_module
+from app.api.schemas import TaskRead, UserRead
+from app.cache import UserCache, UserVersions
+from app.consumer import (
+    BackgroundConsumer,
+    feed_task_changes,
+    invalidate_user_cache,
+    supervise,
+)
+from app.db.models import Role, TaskStatus, User
+from app.feed import TaskFeed
+
+
+class BrokenKafkaConsumer:
+    """Serves the given messages, then fails the way a lost broker connection does."""
+
+    def __init__(self, messages: list[SimpleNamespace]) -> None:
+        self.messages = messages
+        self.stopped = False
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+    def __aiter__(self):
+        return self.iter_messages()
+
+    async def iter_messages(self):
+        for message in self.messages:
+            yield message
+        raise ConnectionError("kafka is down")
+
+
+class BrokenBatchKafkaConsumer(BrokenKafkaConsumer):
+    async def getmany(self, timeout_ms: int, max_records: int) -> dict[str, list[SimpleNamespace]]:
+        if not self.messages:
+            raise ConnectionError("kafka is down")
+        batch, self.messages = self.messages, []
+        return {"task-streaming-0": batch}
+
+
+class TaskRepositoryStub:
+    def __init__(self, tasks: list[TaskRead]) -> None:
+        self.tasks = {task.public_id: task for task in tasks}
+        self.reads: list[set] = []
+
+    async def get_tasks_by_public_ids(self, public_ids: set) -> list[TaskRead]:
+        self.reads.append(set(public_ids))
+        return [self.tasks[public_id] for public_id in public_ids]
+
+
+def user_event(user: User, version: int) -> SimpleNamespace:
+    data = {"public_id": str(user.public_id), "username": user.username, "version": version}
+    return SimpleNamespace(value=json.dumps({"data": data}).encode(), headers=[])
+
+
+def task_event(task: TaskRead, event_name: bytes) -> SimpleNamespace:
+    data = {"public_id": str(task.public_id)}
+    return SimpleNamespace(value=json.dumps({"data": data}).encode(), headers=[("event_name", event_name)])
+
+
+async def test_background_consumer_restarts_after_failures():
+    runs = []
+    stop = asyncio.Event()
+
+    async def consume(on_started):
+        runs.append(len(runs))
+        if len(runs) < 3:
+            raise ConnectionError("kafka is down")
+        on_started()
+        await stop.wait()
+
+    consumer = BackgroundConsumer("test", consume, min_backoff=0.01, max_backoff=0.02)
+    consumer.start()
+    while not consumer.up:
+        await asyncio.sleep(0.01)
+
+    assert (runs, consumer.restarts) == ([0, 1, 2], 2)
+    stop.set()
+    while consumer.up:
+        await asyncio.sleep(0.01)
+    assert consumer.restarts == 3
+    await consumer.stop()
+
+
+async def test_user_cache_invalidation_forgets_what_it_may_have_missed(monkeypatch):
+    cached, changed = (User(public_id=uuid4(), username=name, role=Role.DEVELOPER) for name in ("cached", "changed"))
+    user_cache = UserCache(maxsize=10, ttl=60)
+    user_cache.add(cached)
+    now = 100.0
+    user_versions = UserVersions(timer=lambda: now)
+    kafka_consumer = BrokenKafkaConsumer([user_event(changed, version=3)])
+    monkeypatch.setattr(consumer_module, "AIOKafkaConsumer", lambda *args, **kwargs: kafka_consumer)
+
+    def on_started() -> None:
+        # users cached before the consumer started may have changed unseen, those cached after are invalidated
+        assert user_cache.get_by_public_id(cached.public_id) is None
+        user_cache.add(changed)
+
+    now = 200.0
+    with pytest.raises(ConnectionError):
+        await invalidate_user_cache(user_cache, user_versions, on_started)
+
+    assert user_cache.get_by_public_id(changed.public_id) is None
+    assert kafka_consumer.stopped
+    # tokens issued before the restart are checked against the database again
+    assert not user_versions.is_current(cached.public_id, version=1, issued_at=150.0)
+    assert user_versions.is_current(cached.public_id, version=1, issued_at=250.0)
+    assert not user_versions.is_current(changed.public_id, version=2, issued_at=250.0)
+
+
+async def test_task_feed_reads_each_batch_once(monkeypatch):
+    assignee = UserRead(public_id=uuid4(), username="developer", is_active=True, role="developer")
+    created, updated = (
+        TaskRead(id=number, public_id=uuid4(), description="task", status=TaskStatus.IN_PROGRESS, assignee=assignee)
+        for number in (1, 2)
+    )
+    malformed = SimpleNamespace(value=b"{}", headers=[])
+    messages = [task_event(created, b"task.created"), malformed, task_event(updated, b"task.updated")]
+    kafka_consumer = BrokenBatchKafkaConsumer(messages + [task_event(updated, b"task.updated")])
+    monkeypatch.setattr(consumer_module, "AIOKafkaConsumer", lambda *args, **kwargs: kafka_consumer)
+    task_repository = TaskRepositoryStub([created, updated])
+    task_feed = TaskFeed(buffer_size=10)
+    everyone, other = task_feed.subscribe(), task_feed.subscribe(uuid4())
+    started = []
+
+    with pytest.raises(ConnectionError):
+        await feed_task_changes(task_feed, task_repository, lambda: started.append(True))
+
+    assert started == [True]
+    assert task_repository.reads == [{created.public_id, updated.public_id}]
+    assert sorted(everyone.queue.get_nowait() for _ in range(2)) == sorted(
+        f"data: {task.json()}\n\n" for task in (created, updated)
+    )
+    # neither task was ever theirs
+    assert other.queue.empty()
+    assert kafka_consumer.stopped
+
+
+async def fail_on_start(worker: int) -> None:
+    # runs in the spawned worker processes, which inherit the environment
+    with open(os.environ["CONSUMER_TEST_STARTS"], "a") as starts:
+        starts.write(f"{worker}\n")
+    raise ConnectionError("kafka is down")
+
+
+def test_supervisor_restarts_a_worker_whose_main_fails(tmp_path, monkeypatch):
+    starts = tmp_path / "starts"
+    starts.touch()
+    monkeypatch.setenv("CONSUMER_TEST_STARTS", str(starts))
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+
+    def stop_after_restarts() -> None:
+        deadline = time.monotonic() + 60
+        while len(starts.read_text().split()) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=stop_after_restarts, daemon=True).start()
+    try:
+        supervise(1, consume=fail_on_start)
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    # the failed worker exited instead of idling, so it was started again
+    assert starts.read_text().split()[:3] == ["0", "0", "0"]
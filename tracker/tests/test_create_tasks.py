@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.api.schemas import TaskWrite
+from app.db.models import Role, Task, TaskStatus
+from app.db.repositories import NoTaskAssignees, TaskRepository
+
+
+async def count_tasks(db) -> int:
+    async with db.session() as session:
+        return (await session.execute(select(func.count(Task.id)))).scalar_one()
+
+
+async def test_create_task_assigns_an_eligible_user(db, add_users):
+    _, developer = await add_users(Role.MANAGER, Role.DEVELOPER)
+
+    task = await TaskRepository(db).create_task(TaskWrite(description="write tests", status=TaskStatus.DONE))
+
+    assert (task.description, task.status, task.assignee_id) == ("write tests", TaskStatus.DONE, developer.public_id)
+    assert task.assignee.username == developer.username
+    assert task.public_id and task.created_at
+
+
+async def test_create_task_without_eligible_assignees_inserts_nothing(db, add_users):
+    await add_users(Role.ADMIN, Role.MANAGER)
+
+    with pytest.raises(NoTaskAssignees):
+        await TaskRepository(db).create_task(TaskWrite(description="write tests"))
+    assert await count_tasks(db) == 0
+
+
+async def test_create_tasks_assigns_eligible_users_in_input_order(db, add_users):
+    _, *eligible = await add_users(Role.ADMIN, Role.DEVELOPER, Role.ACCOUNTANT, Role.DEVELOPER)
+    tasks_to_create = [TaskWrite(description=f"task {number}", status=TaskStatus.DONE) for number in range(500)]
+
+    tasks = await TaskRepository(db).create_tasks(tasks_to_create)
+
+    assert [(task.description, task.status) for task in tasks] == [
+        (task.description, task.status) for task in tasks_to_create
+    ]
+    eligible_ids = {user.public_id for user in eligible}
+    assert {task.assignee_id for task in tasks} == eligible_ids
+    assert all(task.assignee.public_id == task.assignee_id for task in tasks)
+    assert len({task.public_id for task in tasks}) == len(tasks)
+    assert await count_tasks(db) == len(tasks)
+
+
+async def test_create_tasks_without_eligible_assignees_inserts_nothing(db, add_users):
+    await add_users(Role.ADMIN)
+
+    with pytest.raises(NoTaskAssignees):
+        await TaskRepository(db).create_tasks([TaskWrite(description="write tests")] * 3)
+    assert await count_tasks(db) == 0
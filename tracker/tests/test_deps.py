@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.api import deps
+from app.api.deps import get_http_client
+
+
+async def test_concurrent_first_requests_share_one_http_client(monkeypatch):
+    created = []
+
+    def create_http_client() -> object:
+        # building the real client's TLS context takes a while too
+        time.sleep(0.01)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(deps, "create_http_client", create_http_client)
+    app = FastAPI()
+    app.state.http_client = None
+
+    @app.get("/client")
+    async def read_client(http_client=Depends(get_http_client)) -> int:
+        return id(http_client)
+
+    async with httpx.AsyncClient(app=app, base_url="http://tracker") as client:
+        responses = await asyncio.gather(*(client.get("/client") for _ in range(20)))
+
+    assert len(created) == 1
+    assert {response.json() for response in responses} == {id(app.state.http_client)}
@@ -0,0 +1,15 @@
+from app.db.models import Role
+from app.db.repositories import TaskReadRepository
+
+
+async def test_stream_tasks_yields_every_task_over_several_chunks(db, add_users, add_tasks):
+    first, second = await add_users(Role.DEVELOPER, Role.ACCOUNTANT)
+    await add_tasks(first, 4)
+    await add_tasks(second, 3)
+
+    chunks = [chunk async for chunk in TaskReadRepository(db).stream_tasks(chunk_size=3)]
+
+    assert [[task.id for task in chunk] for chunk in chunks] == [[1, 2, 3], [4, 5, 6], [7]]
+    # assignees seen in an earlier chunk are still complete in later ones
+    expected_usernames = [first.username] * 4 + [second.username] * 3
+    assert [task.assignee.username for chunk in chunks for task in chunk] == expected_usernames
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from uuid import UUID, uuid4
+
+from app.api.schemas import TaskRead, UserRead
+from app.db.models import TaskStatus
+from app.feed import TaskFeed, iter_task_feed
+from app.settings.config import settings
+
+DEVELOPER, OTHER_DEVELOPER = uuid4(), uuid4()
+
+
+def task_read(assignee_id: UUID) -> TaskRead:
+    assignee = UserRead(public_id=assignee_id, username=str(assignee_id), is_active=True, role="developer")
+    return TaskRead(id=1, public_id=uuid4(), description="task", status=TaskStatus.IN_PROGRESS, assignee=assignee)
+
+
+def drain(queue: asyncio.Queue) -> list[str]:
+    return [queue.get_nowait() for _ in range(queue.qsize())]
+
+
+async def next_message(stream) -> str:
+    return await asyncio.wait_for(stream.__anext__(), timeout=1)
+
+
+async def wait_for_subscribers(task_feed: TaskFeed, count: int) -> None:
+    while len(task_feed._subscribers) < count:
+        await asyncio.sleep(0)
+
+
+async def test_publish_fans_out_by_assignee():
+    task_feed = TaskFeed(buffer_size=10)
+    everyone, mine = task_feed.subscribe(), task_feed.subscribe(DEVELOPER)
+    tasks = [task_read(DEVELOPER), task_read(DEVELOPER)]
+
+    task_feed.publish(tasks)
+
+    everyone_messages, mine_messages = drain(everyone.queue), drain(mine.queue)
+    assert everyone_messages == mine_messages == [f"data: {task.json()}\n\n" for task in tasks]
+    # rendered once for every subscriber
+    assert all(sent is received for sent, received in zip(everyone_messages, mine_messages))
+
+
+async def test_mine_subscriber_only_hears_about_tasks_it_owned():
+    task_feed = TaskFeed(buffer_size=2)
+    shown, sent, never_owned = task_read(DEVELOPER), task_read(DEVELOPER), task_read(OTHER_DEVELOPER)
+    mine = task_feed.subscribe(DEVELOPER, shown=[shown.public_id])
+    task_feed.publish([sent])
+    drain(mine.queue)
+
+    # many more changes than the buffer holds, none of them to this developer's tasks
+    for _ in range(10):
+        task_feed.publish([never_owned, task_read(OTHER_DEVELOPER)])
+    assert mine.queue.empty() and not mine.evicted
+
+    reassigned = [task.copy(update={"assignee": never_owned.assignee}) for task in (shown, sent)]
+    task_feed.publish(reassigned)
+    task_feed.publish(reassigned)
+    removals = [f"event: removed\ndata: {json.dumps({'public_id': str(task.public_id)})}\n\n" for task in (shown, sent)]
+    # told once per task, and forgotten once unsubscribed
+    assert drain(mine.queue) == removals
+    task_feed.unsubscribe(mine)
+    assert task_feed._by_assignee == {} and task_feed._by_task == {}
+
+
+async def test_slow_client_is_evicted_and_told_to_reset():
+    task_feed = TaskFeed(buffer_size=2)
+    stream = iter_task_feed(task_feed, None)
+    pending = asyncio.ensure_future(next_message(stream))
+    await wait_for_subscribers(task_feed, 1)
+    (subscriber,) = task_feed._subscribers
+    fast = task_feed.subscribe()
+
+    tasks = [task_read(DEVELOPER) for _ in range(3)]
+    fast_messages = []
+    for task in tasks:
+        task_feed.publish([task])
+        fast_messages += drain(fast.queue)
+
+    assert subscriber.evicted and task_feed._subscribers == {fast}
+    # the rest of the buffer is dropped: the client reloads on reset anyway
+    assert await pending == f"data: {tasks[0].json()}\n\n"
+    assert await next_message(stream) == "event: reset\ndata: {}\n\n"
+    assert len(fast_messages) == 3
+
+
+async def test_idle_stream_gets_heartbeats(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_FEED_HEARTBEAT_INTERVAL", 0.01)
+    stream = iter_task_feed(TaskFeed(buffer_size=10), None)
+
+    assert await next_message(stream) == ": ping\n\n"
+    await stream.aclose()
+
+
+async def test_disconnected_client_is_unsubscribed():
+    task_feed = TaskFeed(buffer_size=10)
+
+    async def read_stream() -> None:
+        async for _ in iter_task_feed(task_feed, DEVELOPER):
+            pass
+
+    # a client disconnect cancels the response task while it waits for the next message
+    reader = asyncio.create_task(read_stream())
+    await wait_for_subscribers(task_feed, 1)
+    reader.cancel()
+    await asyncio.gather(reader, return_exceptions=True)
+
+    assert task_feed._subscribers == set()
+
+
+async def test_client_disconnecting_as_a_message_arrives_is_unsubscribed():
+    task_feed = TaskFeed(buffer_size=10)
+
+    async def read_stream() -> None:
+        async for _ in iter_task_feed(task_feed, DEVELOPER):
+            pass
+
+    readers = [asyncio.create_task(read_stream()) for _ in range(100)]
+    await wait_for_subscribers(task_feed, len(readers))
+    task_feed.publish([task_read(DEVELOPER)])
+    # some streams have their message but haven't resumed yet when the disconnect cancels them
+    await asyncio.sleep(0)
+    for reader in readers:
+        reader.cancel()
+    await asyncio.wait_for(asyncio.gather(*readers, return_exceptions=True), timeout=1)
+
+    assert task_feed._subscribers == set()
+
+
+async def test_close_ends_every_stream():
+    task_feed = TaskFeed(buffer_size=10)
+    streams = [iter_task_feed(task_feed, assignee_id) for assignee_id in (None, DEVELOPER)]
+    pending = [asyncio.ensure_future(next_message(stream)) for stream in streams]
+    await wait_for_subscribers(task_feed, 2)
+
+    task_feed.close()
+
+    for reader in pending:
+        assert isinstance((await asyncio.gather(reader, return_exceptions=True))[0], StopAsyncIteration)
+    assert task_feed._subscribers == set()
@@ -0,0 +1,69 @@
+import asyncio
+from uuid import uuid4
+
+from app.db.models import JobStatus
+from app.db.repositories import JobRepository
+from app.jobs import JobRegistry
+
+
+async def wait_for_status(registry: JobRegistry, job_id, status: JobStatus):
+    for _ in range(100):
+        job = await registry.get(job_id)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} is {job.status}, not {status}")
+
+
+async def test_job_state_is_visible_to_every_worker(db):
+    worker, other_worker = JobRegistry(JobRepository(db)), JobRegistry(JobRepository(db))
+    batch_done = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def work(report_progress) -> None:
+        await report_progress(10)
+        batch_done.set()
+        await finish.wait()
+        await report_progress(5)
+
+    job = await worker.submit(work)
+    assert job.status == JobStatus.PENDING
+
+    await batch_done.wait()
+    running = await other_worker.get(job.id)
+    assert (running.status, running.processed) == (JobStatus.RUNNING, 10)
+    finish.set()
+    done = await wait_for_status(other_worker, job.id, JobStatus.DONE)
+    assert (done.processed, done.error) == (15, None)
+
+
+async def test_failed_job_keeps_its_error(db):
+    registry = JobRegistry(JobRepository(db))
+
+    async def work(report_progress) -> None:
+        raise RuntimeError("no assignees")
+
+    job = await registry.submit(work)
+
+    failed = await wait_for_status(registry, job.id, JobStatus.FAILED)
+    assert failed.error == "no assignees"
+
+
+async def test_shutdown_marks_running_jobs_failed(db):
+    registry = JobRegistry(JobRepository(db))
+    started = asyncio.Event()
+
+    async def work(report_progress) -> None:
+        started.set()
+        await asyncio.Event().wait()
+
+    job = await registry.submit(work)
+    await started.wait()
+    await registry.close()
+
+    interrupted = await registry.get(job.id)
+    assert (interrupted.status, interrupted.error) == (JobStatus.FAILED, "Interrupted by shutdown")
+
+
+async def test_unknown_job_is_none(db):
+    assert await JobRegistry(JobRepository(db)).get(uuid4()) is None
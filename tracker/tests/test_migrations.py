@@ -0,0 +1,98 @@
+import asyncio
+from uuid import uuid4
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from fastapi_utils.guid_type import GUID
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    text,
+)
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.models import Role, TaskStatus
+from app.settings.config import settings
+from tests.conftest import ALEMBIC_CONFIG, execute
+
+ASSIGNEE_ID = uuid4()
+
+# the tables as metadata.create_all built them at startup before the schema was migrated
+legacy_metadata = MetaData()
+Table(
+    "user",
+    legacy_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("public_id", GUID, unique=True, nullable=False, index=True),
+    Column("username", String, unique=True, nullable=False, index=True),
+    Column("is_active", Boolean(), default=True),
+    Column("role", Enum(Role), nullable=False),
+)
+Table(
+    "task",
+    legacy_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("public_id", GUID, unique=True, nullable=False),
+    Column("description", String, nullable=False),
+    Column("status", Enum(TaskStatus), nullable=False),
+    Column("assignee_id", GUID, ForeignKey("user.public_id"), nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+
+async def create_legacy_schema() -> None:
+    await execute("DROP SCHEMA public CASCADE", "CREATE SCHEMA public")
+    engine = create_async_engine(settings.database_connection_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(legacy_metadata.create_all)
+        await connection.execute(
+            legacy_metadata.tables["user"].insert(),
+            {"public_id": ASSIGNEE_ID, "username": "developer", "is_active": True, "role": Role.DEVELOPER},
+        )
+        await connection.execute(
+            legacy_metadata.tables["task"].insert(),
+            {"public_id": uuid4(), "description": "kept", "status": TaskStatus.IN_PROGRESS, "assignee_id": ASSIGNEE_ID},
+        )
+    await engine.dispose()
+
+
+async def read_schema() -> tuple[str, list[str], dict[str, list[str]]]:
+    engine = create_async_engine(settings.database_connection_url)
+    async with engine.connect() as connection:
+        version = (await connection.execute(text("SELECT version_num FROM alembic_version"))).scalar_one()
+        descriptions = (await connection.execute(text("SELECT description FROM task"))).scalars().all()
+
+        def read_indexes(sync_connection) -> dict[str, list[str]]:
+            inspector = inspect(sync_connection)
+            return {
+                table: sorted(index["name"] for index in inspector.get_indexes(table)) for table in ("task", "user")
+            }
+
+        indexes = await connection.run_sync(read_indexes)
+    await engine.dispose()
+    return version, descriptions, indexes
+
+
+def test_upgrade_adopts_a_schema_built_by_create_all(database_schema):
+    config = Config(str(ALEMBIC_CONFIG))
+    asyncio.run(create_legacy_schema())
+
+    command.upgrade(config, "head")
+
+    version, descriptions, indexes = asyncio.run(read_schema())
+    assert version == ScriptDirectory.from_config(config).get_current_head()
+    assert descriptions == ["kept"]
+    assert indexes == {
+        "task": ["ix_task_assignee_id_id", "ix_task_id", "ix_task_open", "task_public_id_key"],
+        "user": ["ix_user_id", "ix_user_public_id", "ix_user_role", "ix_user_username"],
+    }
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import select, update
+
+from app.db.models import OutboxMessage, Role, Task
+from app.db.repositories import OutboxRepository, TaskRepository, to_outbox_messages
+
+
+class TaskShuffled(BaseModel):
+    task_id: int
+
+
+def iter_shuffled_events(task: Task):
+    yield TaskShuffled(task_id=task.id), "task-streaming"
+
+
+async def add_messages(db, count: int) -> None:
+    async with db.session() as session:
+        session.add_all(to_outbox_messages((TaskShuffled(task_id=number), "task-streaming") for number in range(count)))
+        await session.commit()
+
+
+async def read_messages(db) -> list[OutboxMessage]:
+    async with db.session() as session:
+        return (await session.execute(select(OutboxMessage).order_by(OutboxMessage.id))).scalars().all()
+
+
+async def test_shuffle_writes_events_to_outbox(db, add_users, add_tasks):
+    (developer,) = await add_users(Role.DEVELOPER)
+    tasks = await add_tasks(developer, 5)
+
+    shuffled = TaskRepository(db).iter_shuffled_tasks(batch_size=2, events=iter_shuffled_events)
+    assert [len(batch) async for batch in shuffled] == [2, 2, 1]
+
+    messages = await read_messages(db)
+    assert [TaskShuffled.parse_raw(message.payload).task_id for message in messages] == [task.id for task in tasks]
+    assert {(message.topic, message.event_name, message.sent_at) for message in messages} == {
+        ("task-streaming", "TaskShuffled", None)
+    }
+
+
+async def test_shuffle_batch_and_its_events_commit_together(db, add_users, add_tasks):
+    admin, developer = await add_users(Role.ADMIN, Role.DEVELOPER)
+    tasks = await add_tasks(admin, 4)
+
+    def iter_events(task: Task):
+        if task.id == tasks[-1].id:
+            raise RuntimeError("broken event")
+        return iter_shuffled_events(task)
+
+    with pytest.raises(RuntimeError):
+        async for _ in TaskRepository(db).iter_shuffled_tasks(batch_size=2, events=iter_events):
+            pass
+
+    async with db.session() as session:
+        assignee_ids = (await session.execute(select(Task.assignee_id).order_by(Task.id))).scalars().all()
+    assert assignee_ids == [developer.public_id] * 2 + [admin.public_id] * 2
+    assert [TaskShuffled.parse_raw(message.payload).task_id for message in await read_messages(db)] == [
+        task.id for task in tasks[:2]
+    ]
+
+
+async def test_relay_publishes_oldest_unsent_messages_and_marks_them_sent(db):
+    await add_messages(db, 5)
+    published = []
+
+    async def publish(messages: list[OutboxMessage]) -> None:
+        published.append([message.id for message in messages])
+
+    repository = OutboxRepository(db)
+    assert await repository.relay(publish, batch_size=3) == 3
+    assert await repository.relay(publish, batch_size=3) == 2
+    assert await repository.relay(publish, batch_size=3) == 0
+
+    assert published == [[1, 2, 3], [4, 5]]
+    assert all(message.sent_at is not None for message in await read_messages(db))
+
+
+async def test_relay_keeps_messages_unsent_when_publishing_fails(db):
+    await add_messages(db, 2)
+
+    async def publish(messages: list[OutboxMessage]) -> None:
+        raise ConnectionError("kafka is down")
+
+    with pytest.raises(ConnectionError):
+        await OutboxRepository(db).relay(publish, batch_size=10)
+
+    assert [message.sent_at for message in await read_messages(db)] == [None, None]
+
+
+async def test_concurrent_relays_skip_locked_messages(db):
+    await add_messages(db, 4)
+    published, first_publishing, second_published = [], asyncio.Event(), asyncio.Event()
+
+    async def publish_slowly(messages: list[OutboxMessage]) -> None:
+        first_publishing.set()
+        await second_published.wait()
+        published.extend(message.id for message in messages)
+
+    async def publish(messages: list[OutboxMessage]) -> None:
+        published.extend(message.id for message in messages)
+        second_published.set()
+
+    repository = OutboxRepository(db)
+    first = asyncio.create_task(repository.relay(publish_slowly, batch_size=2))
+    await first_publishing.wait()
+    assert await repository.relay(publish, batch_size=2) == 2
+    assert await first == 2
+
+    assert published == [3, 4, 1, 2]
+
+
+async def test_delete_sent_keeps_unsent_and_recent_messages(db):
+    await add_messages(db, 3)
+    async with db.session() as session:
+        await session.execute(
+            update(OutboxMessage).where(OutboxMessage.id == 1).values(sent_at=datetime.now() - timedelta(days=2))
+        )
+        await session.execute(update(OutboxMessage).where(OutboxMessage.id == 2).values(sent_at=datetime.now()))
+        await session.commit()
+
+    assert await OutboxRepository(db).delete_sent(timedelta(days=1)) == 1
+
+    assert [message.id for message in await read_messages(db)] == [2, 3]
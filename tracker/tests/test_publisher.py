@@ -0,0 +1,61 @@
+from uuid import UUID, uuid4
+
+import pytest
+from pydantic import BaseModel
+
+from app.codecs import CODECS, JsonCodec, MsgpackCodec, decode_message
+from app.publisher import relay_outbox, send_events
+
+
+class TaskData(BaseModel):
+    public_id: UUID
+
+
+class TaskUpdated(BaseModel):
+    event_name: str = "task.updated"
+    data: TaskData
+
+
+class RecordingProducer:
+    def __init__(self) -> None:
+        self.sent: list[tuple[str, bytes, bytes | None, list[tuple[str, bytes]]]] = []
+
+    async def send_and_wait(self, topic: str, value: bytes, key: bytes | None, headers: list[tuple[str, bytes]]):
+        self.sent.append((topic, value, key, headers))
+
+
+@pytest.mark.parametrize("content_type", [JsonCodec.content_type, MsgpackCodec.content_type])
+async def test_events_are_keyed_by_public_id_with_every_codec(content_type):
+    if content_type not in CODECS:
+        pytest.skip("msgpack is not installed")
+    producer = RecordingProducer()
+    events = [TaskUpdated(data=TaskData(public_id=uuid4())) for _ in range(3)]
+
+    sent = await send_events(
+        producer, ((event, "task-streaming") for event in events), batch_size=2, codec=CODECS[content_type]
+    )
+
+    assert sent == 3
+    assert [key for _, _, key, _ in producer.sent] == [str(event.data.public_id).encode() for event in events]
+    assert [decode_message(value, headers)["data"]["public_id"] for _, value, _, headers in producer.sent] == [
+        str(event.data.public_id) for event in events
+    ]
+
+
+async def test_relay_retries_failures_then_gives_up():
+    results = [ConnectionError("kafka is down"), 5, ConnectionError("kafka is down"), ConnectionError("db is down")]
+    calls = 0
+
+    async def relay_batch() -> int:
+        nonlocal calls
+        calls += 1
+        result = results[calls - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    # a success resets the count, so only the last two failures are in a row
+    with pytest.raises(ConnectionError, match="db is down"):
+        await relay_outbox(relay_batch, batch_size=10, poll_interval=0.001, max_retries=1, max_backoff=0.001)
+
+    assert calls == 4
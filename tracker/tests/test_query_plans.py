@@ -0,0 +1,110 @@
+from typing import Any, Iterator
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.schemas import TaskWrite
+from app.db.models import Role, TaskStatus, User
+from app.db.repositories import (
+    OutboxRepository,
+    TaskReadRepository,
+    TaskRepository,
+    UserRepository,
+)
+from app.db.session import Database
+from app.security import Principal
+from app.settings.config import settings
+from tests.conftest import seed
+
+# tables this small are cheaper to scan than to look up by index
+SEQ_SCAN_MAX_ROWS = 1_000
+
+
+class RecordedStatements:
+    """Collects the SQL every engine sends to the database, with its parameters."""
+
+    def __init__(self) -> None:
+        self.statements: list[tuple[str, Any]] = []
+
+    def __enter__(self) -> "RecordedStatements":
+        event.listen(Engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(Engine, "before_cursor_execute", self.record)
+
+    def record(self, connection, cursor, statement: str, parameters, context, executemany: bool) -> None:
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            self.statements.append((statement, parameters))
+
+
+def iter_plan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_plan_nodes(child)
+
+
+async def find_large_seq_scans(statements: list[tuple[str, Any]]) -> list[tuple[str, str]]:
+    seq_scans = []
+    engine = create_async_engine(settings.database_connection_url)
+    async with engine.connect() as connection:
+        rows = await connection.execute(text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"))
+        table_rows = dict(rows.all())
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            (plan,) = result.scalar_one()
+            for node in iter_plan_nodes(plan["Plan"]):
+                relation = node.get("Relation Name")
+                if node["Node Type"] == "Seq Scan" and table_rows.get(relation, 0) > SEQ_SCAN_MAX_ROWS:
+                    seq_scans.append((relation, statement))
+    await engine.dispose()
+    return seq_scans
+
+
+@pytest.fixture
+async def seeded_db(db: Database) -> Database:
+    await seed(db, users=200, tasks=20_000, done_ratio=0.5)
+    async with db.session() as session:
+        session.add(User(public_id=uuid4(), username="manager", role=Role.MANAGER))
+        await session.commit()
+    return db
+
+
+async def run_repository_queries(db: Database) -> None:
+    async with db.session() as session:
+        query = text("SELECT id, public_id, assignee_id FROM task WHERE status != 'DONE' ORDER BY id LIMIT 1")
+        task_id, public_id, assignee_id = (await session.execute(query)).one()
+
+    read_repository, task_repository = TaskReadRepository(db), TaskRepository(db)
+    await read_repository.get_tasks(101)
+    await read_repository.get_tasks(101, after_id=10_000)
+    await read_repository.get_tasks(101, after_id=10_000, status=TaskStatus.DONE)
+    await read_repository.get_tasks(101, after_id=10_000, assignee_id=assignee_id)
+    async for _ in read_repository.stream_tasks(chunk_size=1_000):
+        break
+    await task_repository.get_tasks_by_public_ids([public_id])
+    await task_repository.create_task(TaskWrite(description="planned"))
+    await task_repository.create_tasks([TaskWrite(description="planned")] * 2)
+    principal = Principal(public_id=assignee_id, username="", role=Role.DEVELOPER, is_active=True)
+    await task_repository.complete_task(task_id, principal)
+    async for _ in task_repository.iter_shuffled_tasks(batch_size=1_000):
+        break
+
+    await UserRepository(db).get_user_by_username("manager")
+
+    async def publish(messages) -> None:
+        pass
+
+    await OutboxRepository(db).relay(publish, batch_size=100)
+
+
+async def test_repository_queries_do_not_scan_large_tables(seeded_db):
+    with RecordedStatements() as recorded:
+        await run_repository_queries(seeded_db)
+
+    # the first statement only picks the task the others work with
+    assert len(recorded.statements) > 10
+    assert await find_large_seq_scans(recorded.statements) == []
@@ -0,0 +1,20 @@
+import json
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.responses import FastJSONResponse
+from app.api.schemas import TaskRead
+from app.api.serializers import serialize_task
+from app.db.models import Role, TaskStatus
+from app.db.repositories import AssigneeRow, TaskRow
+
+
+def test_fast_json_matches_fastapi_encoding():
+    assignee = AssigneeRow(public_id=uuid4(), username="developer", is_active=True, role=Role.DEVELOPER)
+    task = TaskRow(1, uuid4(), "описание", TaskStatus.DONE, assignee)
+
+    body = FastJSONResponse({"items": [serialize_task(task)], "next_cursor": None}).body
+
+    expected = {"items": [jsonable_encoder(TaskRead.from_orm(task))], "next_cursor": None}
+    assert json.loads(body) == expected
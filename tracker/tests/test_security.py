@@ -0,0 +1,46 @@
+import hashlib
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from app.cache import TTLCache
+from app.security import decode_access_token
+from app.settings.config import settings
+
+
+def create_token(**claims) -> str:
+    return jwt.encode({"sub": "developer", **claims}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def test_decoded_claims_are_cached_until_the_token_expires():
+    clock = [time.time()]
+    token_cache = TTLCache("token", maxsize=10, ttl=300, timer=lambda: clock[0])
+    token = create_token(exp=clock[0] + 60)
+
+    payload = decode_access_token(token, token_cache)
+    assert payload["sub"] == "developer"
+    clock[0] += 55
+    assert decode_access_token(token, token_cache) is payload
+    clock[0] += 10
+    assert token_cache.get(hashlib.sha256(token.encode()).digest()) is None
+
+
+def test_tokens_without_exp_are_cached_for_the_cache_ttl():
+    clock = [time.time()]
+    token_cache = TTLCache("token", maxsize=10, ttl=300, timer=lambda: clock[0])
+    token = create_token()
+
+    payload = decode_access_token(token, token_cache)
+    clock[0] += 295
+    assert decode_access_token(token, token_cache) is payload
+    clock[0] += 10
+    assert decode_access_token(token, token_cache) is not payload
+
+
+def test_tokens_with_a_bad_signature_are_not_cached():
+    token_cache = TTLCache("token", maxsize=10, ttl=300)
+
+    with pytest.raises(JWTError):
+        decode_access_token(create_token() + "x", token_cache)
+    assert len(token_cache) == 0
@@ -0,0 +1,48 @@
+from uuid import uuid4
+
+from sqlalchemy import event, func, select
+from sqlalchemy.pool import Pool
+
+from app.db.models import Role, User
+from app.db.repositories import UserRepository
+
+
+class CountCheckouts:
+    def __init__(self) -> None:
+        self.checkouts = 0
+
+    def __enter__(self) -> "CountCheckouts":
+        event.listen(Pool, "checkout", self.count)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(Pool, "checkout", self.count)
+
+    def count(self, *args) -> None:
+        self.checkouts += 1
+
+
+async def test_unit_of_work_serves_every_session_from_one_connection(db):
+    repository = UserRepository(db)
+
+    with CountCheckouts() as outside:
+        for _ in range(3):
+            await repository.get_user_by_username("developer")
+    with CountCheckouts() as inside:
+        async with db.unit_of_work():
+            async with db.session() as first, db.session() as second:
+                assert first is second
+            for _ in range(3):
+                await repository.get_user_by_username("developer")
+
+    assert (outside.checkouts, inside.checkouts) == (3, 1)
+
+
+async def test_unit_of_work_rolls_back_what_was_not_committed(db):
+    async with db.unit_of_work():
+        async with db.session() as session:
+            session.add(User(public_id=uuid4(), username="uncommitted", role=Role.DEVELOPER))
+            await session.flush()
+
+    async with db.session() as session:
+        assert await session.scalar(select(func.count(User.id))) == 0
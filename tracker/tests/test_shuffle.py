@@ -0,0 +1,42 @@
+from sqlalchemy import select
+
+from app.db.models import Role, Task, TaskStatus
+from app.db.repositories import TaskRepository
+
+
+async def test_shuffle_reassigns_open_tasks_in_id_ordered_batches(db, add_users, add_tasks):
+    admin, *assignees = await add_users(Role.ADMIN, Role.DEVELOPER, Role.DEVELOPER, Role.ACCOUNTANT)
+    open_tasks = await add_tasks(admin, 25)
+    done_tasks = await add_tasks(admin, 5, status=TaskStatus.DONE)
+
+    batches = [batch async for batch in TaskRepository(db).iter_shuffled_tasks(batch_size=10)]
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    shuffled = [task for batch in batches for task in batch]
+    assert [task.id for task in shuffled] == sorted(task.id for task in open_tasks)
+    assert {task.assignee_id for task in shuffled} <= {assignee.public_id for assignee in assignees}
+    async with db.session() as session:
+        stored = {task.id: task for task in (await session.execute(select(Task))).scalars()}
+    # the batches are the rows RETURNING gave back, so they match what was committed
+    assert all(stored[task.id].assignee_id == task.assignee_id for task in shuffled)
+    assert all(stored[task.id].assignee_id == admin.public_id for task in done_tasks)
+
+
+async def test_shuffle_without_eligible_assignees_changes_nothing(db, add_users, add_tasks):
+    (manager,) = await add_users(Role.MANAGER)
+    await add_tasks(manager, 3)
+
+    assert [batch async for batch in TaskRepository(db).iter_shuffled_tasks()] == []
+    async with db.session() as session:
+        assignee_ids = (await session.execute(select(Task.assignee_id))).scalars().all()
+    assert assignee_ids == [manager.public_id] * 3
+
+
+async def test_shuffle_batch_is_not_limited_by_bind_parameters(db, add_users, add_tasks):
+    # a batch binds two arrays, so it is not capped at 32767 / 2 rows like a VALUES list would be
+    (developer,) = await add_users(Role.DEVELOPER)
+    await add_tasks(developer, 20_000)
+
+    batches = [batch async for batch in TaskRepository(db).iter_shuffled_tasks(batch_size=20_000)]
+
+    assert [len(batch) for batch in batches] == [20_000]
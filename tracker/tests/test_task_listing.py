@@ -0,0 +1,75 @@
+from app.db.models import Role, TaskStatus
+from app.db.repositories import TaskReadRepository
+
+
+async def read_all_pages(repository: TaskReadRepository, page_size: int, **filters) -> list[list[int]]:
+    pages, after_id = [], None
+    while tasks := await repository.get_tasks(page_size, after_id=after_id, **filters):
+        pages.append([task.id for task in tasks])
+        after_id = tasks[-1].id
+    return pages
+
+
+async def test_keyset_pages_cover_every_task_once_in_id_order(db, add_users, add_tasks):
+    (developer,) = await add_users(Role.DEVELOPER)
+    await add_tasks(developer, 7)
+
+    assert await read_all_pages(TaskReadRepository(db), page_size=3) == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+async def test_pages_are_not_shifted_by_tasks_added_between_requests(db, add_users, add_tasks):
+    (developer,) = await add_users(Role.DEVELOPER)
+    await add_tasks(developer, 4)
+    repository = TaskReadRepository(db)
+
+    first_page = await repository.get_tasks(2)
+    await add_tasks(developer, 2)
+    second_page = await repository.get_tasks(2, after_id=first_page[-1].id)
+
+    assert [task.id for task in first_page + second_page] == [1, 2, 3, 4]
+
+
+async def test_filters_apply_before_the_page_limit(db, add_users, add_tasks):
+    first, second = await add_users(Role.DEVELOPER, Role.ACCOUNTANT)
+    await add_tasks(first, 2)
+    await add_tasks(second, 2)
+    await add_tasks(first, 2, status=TaskStatus.DONE)
+    await add_tasks(second, 2, status=TaskStatus.DONE)
+    repository = TaskReadRepository(db)
+
+    assert await read_all_pages(repository, 3, status=TaskStatus.DONE) == [[5, 6, 7], [8]]
+    assert await read_all_pages(repository, 3, assignee_id=second.public_id) == [[3, 4, 7], [8]]
+    assert await read_all_pages(repository, 3, status=TaskStatus.IN_PROGRESS, assignee_id=first.public_id) == [[1, 2]]
+
+
+async def test_one_extra_row_tells_there_is_a_next_page(db, add_users, add_tasks):
+    (developer,) = await add_users(Role.DEVELOPER)
+    await add_tasks(developer, 3)
+    repository = TaskReadRepository(db)
+
+    # the API asks for limit + 1 rows and drops the extra one
+    assert len(await repository.get_tasks(2 + 1)) == 3
+    assert len(await repository.get_tasks(3 + 1)) == 3
+
+
+async def test_tasks_share_one_assignee_row_per_user(db, add_users, add_tasks):
+    (developer,) = await add_users(Role.DEVELOPER)
+    await add_tasks(developer, 3)
+
+    tasks = await TaskReadRepository(db).get_tasks(10)
+
+    assert len({id(task.assignee) for task in tasks}) == 1
+    assert (tasks[0].assignee.public_id, tasks[0].assignee.username) == (developer.public_id, developer.username)
+
+
+async def test_open_task_ids_leave_out_done_and_other_users_tasks(db, add_users, add_tasks):
+    first, second = await add_users(Role.DEVELOPER, Role.ACCOUNTANT)
+    await add_tasks(first, 2)
+    await add_tasks(first, 1, status=TaskStatus.DONE)
+    await add_tasks(second, 1)
+    repository = TaskReadRepository(db)
+
+    open_ids = await repository.get_open_task_public_ids(first.public_id)
+
+    first_tasks = await repository.get_tasks(10, status=TaskStatus.IN_PROGRESS, assignee_id=first.public_id)
+    assert open_ids == {task.public_id for task in first_tasks} and len(open_ids) == 2
@@ -0,0 +1,112 @@
+import json
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+
+from app.api.schemas import UserWrite
+from app.consumer import upsert_user_states
+from app.db.models import Role, User
+from app.db.repositories import UserRepository
+
+
+def user_state(public_id: UUID, version: int, **changes) -> UserWrite:
+    state = {"public_id": public_id, "username": "developer", "is_active": True, "role": "DEVELOPER"}
+    return UserWrite(**{**state, **changes, "version": version})
+
+
+def user_message(event_name: bytes, state: UserWrite) -> SimpleNamespace:
+    value = json.dumps({"event_name": event_name.decode(), "data": json.loads(state.json())}).encode()
+    return SimpleNamespace(value=value, headers=[("event_name", event_name)])
+
+
+async def read_users(db) -> list[tuple]:
+    query = select(User.public_id, User.username, User.is_active, User.role, User.version).order_by(User.id)
+    async with db.session() as session:
+        return (await session.execute(query)).all()
+
+
+async def test_replayed_user_events_leave_the_same_state(db):
+    public_id = uuid4()
+    events = [
+        user_state(public_id, 0),
+        user_state(public_id, 1, role="MANAGER"),
+        user_state(public_id, 2, role="MANAGER", is_active=False),
+    ]
+    repository = UserRepository(db)
+    for event in events:
+        await repository.upsert_users([event])
+    applied = await read_users(db)
+
+    for event in events:
+        await repository.upsert_users([event])
+    await repository.upsert_users(events)
+
+    assert applied == [(public_id, "developer", False, Role.MANAGER, 2)]
+    assert await read_users(db) == applied
+
+
+async def test_older_user_versions_are_skipped(db):
+    public_id = uuid4()
+    repository = UserRepository(db)
+
+    await repository.upsert_users([user_state(public_id, 3, role="MANAGER")])
+    await repository.upsert_users([user_state(public_id, 2, role="ACCOUNTANT", is_active=False)])
+
+    assert await read_users(db) == [(public_id, "developer", True, Role.MANAGER, 3)]
+
+
+async def test_newest_user_version_in_a_batch_wins_wherever_it_is(db):
+    newest_last, newest_first = uuid4(), uuid4()
+
+    await UserRepository(db).upsert_users(
+        [
+            user_state(newest_first, 2, username="first", role="ACCOUNTANT"),
+            user_state(newest_last, 1, username="last"),
+            user_state(newest_first, 1, username="first", role="MANAGER"),
+            user_state(newest_last, 2, username="last", role="ADMIN"),
+            # for the same version the later event wins
+            user_state(newest_last, 2, username="last", role="MANAGER"),
+        ]
+    )
+
+    assert sorted(await read_users(db)) == sorted(
+        [(newest_first, "first", True, Role.ACCOUNTANT, 2), (newest_last, "last", True, Role.MANAGER, 2)]
+    )
+
+
+async def test_consumer_applies_user_state_events_only(db):
+    created, ignored = uuid4(), uuid4()
+    messages = [
+        user_message(b"user.created", user_state(created, 0)),
+        user_message(b"user.updated", user_state(created, 1, role="ACCOUNTANT")),
+        user_message(b"user.logged_in", user_state(ignored, 0)),
+        SimpleNamespace(value=b"{not json", headers=[("event_name", b"user.updated")]),
+    ]
+
+    await upsert_user_states(UserRepository(db), messages)
+
+    assert await read_users(db) == [(created, "developer", True, Role.ACCOUNTANT, 1)]
+
+
+async def test_consumer_rejects_older_and_unversioned_user_events(db):
+    versioned, unversioned = uuid4(), uuid4()
+    repository = UserRepository(db)
+    await upsert_user_states(repository, [user_message(b"user.updated", user_state(versioned, 2, role="MANAGER"))])
+
+    def unversioned_message(role: str) -> SimpleNamespace:
+        state = {"public_id": str(unversioned), "username": "developer", "is_active": True, "role": role}
+        value = json.dumps({"event_name": "user.updated", "data": state}).encode()
+        return SimpleNamespace(value=value, headers=[("event_name", b"user.updated")])
+
+    await upsert_user_states(
+        repository,
+        [
+            user_message(b"user.updated", user_state(versioned, 1, role="ACCOUNTANT")),
+            # defaulted to one version, these could no longer be told apart if they arrived out of order
+            unversioned_message("MANAGER"),
+            unversioned_message("DEVELOPER"),
+        ],
+    )
+
+    assert await read_users(db) == [(versioned, "developer", True, Role.MANAGER, 2)]